@@ -20,11 +20,69 @@ from bleak import BleakClient, BleakError
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s][%(asctime)s]%(message)s')
 
+# 背景任務被喚醒後再等這麼久 (秒) 才取出指令，讓分開拖動的滑桿合併成一批寫入
+# (短於 BLE 連線間隔，期間的多次更新本來就送不出去)
+QUEUE_FLUSH_DELAY = 0.015
+
+# response=False 的寫入只等封包交給藍牙堆疊就返回，允許同時進行的寫入數上限
+MAX_INFLIGHT_WRITES = 4
+
+# 電源指令只有兩種，直接使用不可變的常數
+_POWER_ON = bytes([123, 255, 4, 1, 255, 255, 255, 255, 191])
+_POWER_OFF = bytes([123, 255, 4, 0, 255, 255, 255, 255, 191])
+
+# 狀態指令碼 -> 會被它覆蓋的指令碼 (7: 靜態顏色, 3: 動態模式)
+_OVERRIDES = {7: 3, 3: 7}
+
+def snapshot_gatt(services) -> list:
+    """將 BleakGATTServiceCollection 轉成可存成 JSON 的 [{"s", "c", "h"}, ...] 清單。"""
+    return [
+        {"s": service.uuid, "c": char.uuid, "h": char.handle}
+        for service in services
+        for char in service.characteristics
+    ]
+
+# 裝置存檔格式版本；版本不符時只保留 MAC 清單，捨棄 GATT 快取
+DEVICE_FILE_VERSION = 1
+
+def normalize_device_data(data):
+    """
+    驗證讀入的裝置存檔並回傳 (MAC 清單, {mac: gatt})。
+    接受舊版的清單與 {"version", "devices"} 格式；每個裝置可以是 MAC 字串或 {"mac": str, "gatt": list}，
+    GATT 快取只在版本相符時保留。其他內容一律拋出 ValueError。
+    """
+    if isinstance(data, list):
+        devices, versioned = data, False
+    elif isinstance(data, dict) and isinstance(data.get("devices", []), list):
+        devices, versioned = data.get("devices", []), data.get("version") == DEVICE_FILE_VERSION
+    else:
+        raise ValueError('Content must be a JSON list of devices or {"devices": [...]}')
+    macs = {} # 保持順序並去除重複
+    gatt_cache = {}
+    for entry in devices:
+        if isinstance(entry, str):
+            macs[entry] = None
+        elif isinstance(entry, dict) and isinstance(entry.get("mac"), str) and isinstance(entry.get("gatt", []), list):
+            macs[entry["mac"]] = None
+            if versioned and entry.get("gatt"):
+                gatt_cache[entry["mac"]] = entry["gatt"]
+        else:
+            raise ValueError(f'Invalid device entry (expected "MAC" or {{"mac": "MAC", "gatt": [...]}}): {entry!r}')
+    return list(macs), gatt_cache
+
+def install_uvloop():
+    """若有安裝 uvloop 則改用它作為事件迴圈，否則沿用 asyncio 預設 (需在建立事件迴圈前呼叫)。"""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 class DMXController:
     """
     一個非同步的 DMX BLE 控制器類別，封裝了所有通訊協議。
     """
-    def __init__(self, device_target):
+    def __init__(self, device_target, gatt_cache=None):
         # device_target can be a MAC address string or a BLEDevice object
         if hasattr(device_target, "address"):
             self._device_address = device_target.address
@@ -32,68 +90,165 @@ class DMXController:
             self._device_address = device_target
             
         self._characteristic_uuid = "0000ffe1-0000-1000-8000-00805f9b34fb"
-        self._client = BleakClient(device_target, timeout=10.0)
-        self._lock = asyncio.Lock()
+        # 寫入時使用的特徵值識別: 預設為 UUID，有 GATT 快取時改用快取的 handle
+        self._char_specifier = self._characteristic_uuid
+        services = None
+        if gatt_cache:
+            # gatt_cache: [{"s": service_uuid, "c": char_uuid, "h": handle}, ...]
+            # 只解析快取中出現過的服務，縮短連線時的服務探索
+            services = sorted({entry["s"] for entry in gatt_cache})
+            for entry in gatt_cache:
+                if entry["c"] == self._characteristic_uuid:
+                    self._char_specifier = entry["h"]
+                    break
+        # 連線狀態快取: 由 connect() 與 bleak 的斷線回呼維護，熱路徑上不必詢問後端 (BlueZ 可能是一次 D-Bus 呼叫)
+        self._connected = False
+        # 各類狀態指令上次成功送出的內容 {指令碼: bytes}，相同的值不再重送
+        self._shadow = {}
+        self._client = BleakClient(device_target, services=services, disconnected_callback=self._on_disconnected, timeout=10.0)
+        # 寫入可重疊進行 (上限 MAX_INFLIGHT_WRITES)；連線/重新連線則只允許一個
+        self._write_sem = asyncio.Semaphore(MAX_INFLIGHT_WRITES)
+        self._reconnect_lock = asyncio.Lock()
+        # 尚未送出的指令 {setter 名稱: 參數}: 同種指令的新值覆蓋舊值，由單一背景任務依序送出
+        self._pending = {}
+        self._pending_event = asyncio.Event()
+        self._worker = None
 
     @property
     def is_connected(self) -> bool:
-        return self._client.is_connected
+        return self._connected
+
+    def _on_disconnected(self, client):
+        logger.info(f"{self._device_address} 已斷線")
+        self._connected = False
+        self._shadow.clear()
 
     async def connect(self):
-        """明確地連接到設備。"""
-        if not self.is_connected:
-            logger.info(f"正在連接到 DMX 控制器: {self._device_address}")
-            await self._client.connect()
+        """明確地連接到設備 (同時多個呼叫時只會連線一次，其餘等待結果)。"""
+        async with self._reconnect_lock:
+            if not self.is_connected:
+                logger.info(f"正在連接到 DMX 控制器: {self._device_address}")
+                await self._client.connect()
+                self._connected = True
+                self._shadow.clear() # 設備狀態未知 (可能重開機或被遙控器改過)，全部重新送出
+                # 快取的 handle 已失效 (例如韌體更新) 時退回以 UUID 寫入
+                if isinstance(self._char_specifier, int) and self._client.services.get_characteristic(self._char_specifier) is None:
+                    logger.warning(f"{self._device_address} 的 GATT 快取已失效，改用 UUID 寫入")
+                    self._char_specifier = self._characteristic_uuid
+
+    def gatt_snapshot(self) -> list:
+        """回傳目前連線探索到的服務/特徵值，格式同 gatt_cache，供下次連線使用。"""
+        return snapshot_gatt(self._client.services)
+
+    def start_workers(self):
+        """啟動 queue_* 使用的背景發送任務 (需在事件迴圈中呼叫，重複呼叫無作用)。"""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._queue_worker())
+
+    async def _queue_worker(self):
+        while True:
+            await self._pending_event.wait()
+            await asyncio.sleep(QUEUE_FLUSH_DELAY)
+            self._pending_event.clear()
+            # 一次取走所有累積的指令 (例如同時拖動顏色與亮度)，依序送出但不等前一筆完成；
+            # 同時進行的寫入數由 _write_sem 限制
+            pending = self._pending
+            self._pending = {}
+            await asyncio.gather(*(getattr(self, name)(*args) for name, args in pending.items()),
+                                 return_exceptions=True) # 錯誤已在 _send_command 記錄
+
+    def _enqueue(self, name, args):
+        # 丟棄尚未送出的舊值，並移到最後以保持指令的先後順序
+        self._pending.pop(name, None)
+        self._pending[name] = args
+        self._pending_event.set()
+
+    def queue_power(self, is_on: bool):
+        """非阻塞版 set_power，只保留最新一筆"""
+        self._enqueue("set_power", (is_on,))
+
+    def queue_color(self, r: int, g: int, b: int):
+        """非阻塞版 set_static_color，只保留最新一筆"""
+        self._enqueue("set_static_color", (r, g, b))
+
+    def queue_brightness(self, brightness: int):
+        """非阻塞版 set_brightness，只保留最新一筆"""
+        self._enqueue("set_brightness", (brightness,))
+
+    def queue_mode(self, mode: int):
+        """非阻塞版 set_mode，只保留最新一筆"""
+        self._enqueue("set_mode", (mode,))
+
+    def queue_speed(self, speed: int):
+        """非阻塞版 set_speed，只保留最新一筆"""
+        self._enqueue("set_speed", (speed,))
 
     async def disconnect(self):
         """明確地中斷與設備的連接。"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
         if self.is_connected:
             logger.info("正在中斷與 DMX 控制器的連接...")
             await self._client.disconnect()
+            self._connected = False
+            self._shadow.clear()
 
-    async def _send_command(self, command: bytearray):
-        """一個統一的、帶有鎖和自動重連機制的指令發送函式。"""
-        async with self._lock:
+    async def _send_command(self, command: bytes):
+        """一個統一的、帶有並行上限和自動重連機制的指令發送函式。"""
+        async with self._write_sem:
             try:
                 if not self.is_connected:
                     await self.connect()
 
                 logger.debug(f"發送指令: {command.hex()}")
-                await self._client.write_gatt_char(self._characteristic_uuid, command, response=False)
+                await self._client.write_gatt_char(self._char_specifier, command, response=False)
             except BleakError as e:
                 logger.error(f"藍牙錯誤: {e}")
+                # 寫入失敗時以後端狀態校正快取，下一次發送才會觸發重連
+                self._connected = self._client.is_connected
                 raise
             except Exception as e:
                 logger.error(f"發送指令時發生未知錯誤: {e}")
                 raise
 
+    async def _send_state(self, command: bytes, force: bool):
+        """送出狀態類指令；與上次成功送出的同類指令 (command[2]) 相同時略過，force=True 則照送。"""
+        kind = command[2]
+        if not force and self._shadow.get(kind) == command:
+            return
+        await self._send_command(command)
+        self._shadow[kind] = command
+        # 靜態顏色與動態模式互相覆蓋: 切換其中一個後，另一個的舊值不再代表設備狀態
+        self._shadow.pop(_OVERRIDES.get(kind), None)
+
     # --- 功能性 API ---
 
-    async def set_static_color(self, r: int, g: int, b: int, a: int = 255):
+    async def set_static_color(self, r: int, g: int, b: int, a: int = 255, force: bool = False):
         """設定靜態顏色"""
-        command = bytearray([123, 255, 7, r, g, b, a, 255, 191])
-        await self._send_command(command)
+        command = bytes((123, 255, 7, r, g, b, a, 255, 191))
+        await self._send_state(command, force)
 
     async def set_power(self, is_on: bool):
         """設定電源開關"""
-        cmd = 1 if is_on else 0
-        command = bytearray([123, 255, 4, cmd, 255, 255, 255, 255, 191])
-        await self._send_command(command)
+        # 開關電源後設備可能回到預設狀態，之後的顏色/亮度等一律重新送出
+        self._shadow.clear()
+        await self._send_command(_POWER_ON if is_on else _POWER_OFF)
 
-    async def set_brightness(self, brightness: int):
+    async def set_brightness(self, brightness: int, force: bool = False):
         """設定亮度 (0-100)"""
         bri = max(0, min(100, brightness))
         bri_scaled = (bri * 32) // 100
-        command = bytearray([123, 255, 1, bri_scaled, bri, 1, 255, 255, 191])
-        await self._send_command(command)
+        command = bytes((123, 255, 1, bri_scaled, bri, 1, 255, 255, 191))
+        await self._send_state(command, force)
 
-    async def set_mode(self, mode: int):
+    async def set_mode(self, mode: int, force: bool = False):
         """設定動態模式 (1-255)"""
-        command = bytearray([123, 255, 3, mode, 255, 255, 255, 255, 191])
-        await self._send_command(command)
+        command = bytes((123, 255, 3, mode, 255, 255, 255, 255, 191))
+        await self._send_state(command, force)
 
-    async def set_speed(self, speed: int):
+    async def set_speed(self, speed: int, force: bool = False):
         """設定動態模式的速度 (0-100)"""
         spd = max(0, min(100, speed))
-        command = bytearray([123, 255, 2, spd, 255, 1, 255, 255, 191])
-        await self._send_command(command)
+        command = bytes((123, 255, 2, spd, 255, 1, 255, 255, 191))
+        await self._send_state(command, force)
@@ -11,8 +11,10 @@
 # 用於全面驗證 DMX 控制器的功能。
 
 import asyncio
+import functools
 import logging
 from bleak import BleakClient, BleakError
+from DMX import install_uvloop
 
 # ----------------------------------------------------
 #               參數 (請確認與您的設備相符)
@@ -28,36 +30,56 @@ CHARACTERISTIC_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
 #               私有協議指令產生器 (已擴充)
 # ----------------------------------------------------
 
-def create_dmx_rgb_command(r: int, g: int, b: int, a: int = 255) -> bytearray:
+# 指令固定為 9 個位元組: 123, 255, 指令碼, 參數 x5, 191；不變的頭尾與只有少數可能值的指令於載入時預先建好
+
+_RGB_PREFIX = b"\x7b\xff\x07"
+_RGB_SUFFIX = b"\xff\xbf"
+_MODE_PREFIX = b"\x7b\xff\x03"
+_MODE_SUFFIX = b"\xff\xff\xff\xff\xbf"
+
+_POWER_CMDS = {
+    True: bytes((123, 255, 4, 1, 255, 255, 255, 255, 191)),
+    False: bytes((123, 255, 4, 0, 255, 255, 255, 255, 191)),
+}
+
+# 亮度與速度只有 0-100 共 101 種可能，直接查表
+_BRIGHTNESS_TABLE = tuple(
+    bytes((123, 255, 1, (bri * 32) // 100, bri, 1 if bri > 0 else 0, 255, 255, 191))
+    for bri in range(101)
+)
+_SPEED_TABLE = tuple(
+    bytes((123, 255, 2, speed, 255, 1, 255, 255, 191)) # direction 暫定為 1
+    for speed in range(101)
+)
+
+@functools.lru_cache(maxsize=1024) # 常用顏色重複送出時直接重用同一個物件
+def create_dmx_rgb_command(r: int, g: int, b: int, a: int = 255) -> bytes:
     """指令碼 7: 設定靜態顏色"""
-    return bytearray([123, 255, 7, r, g, b, a, 255, 191])
+    return _RGB_PREFIX + bytes((r, g, b, a)) + _RGB_SUFFIX
 
-def create_dmx_power_command(is_on: bool) -> bytearray:
+def create_dmx_power_command(is_on: bool) -> bytes:
     """指令碼 4: 開/關"""
-    cmd = 1 if is_on else 0
-    return bytearray([123, 255, 4, cmd, 255, 255, 255, 255, 191])
+    return _POWER_CMDS[bool(is_on)]
 
-def create_dmx_brightness_command(brightness: int) -> bytearray:
+def create_dmx_brightness_command(brightness: int) -> bytes:
     """
     指令碼 1: 設定亮度 (0-100)
     協議文件顯示亮度參數需要兩個值: bri (0-100) 和 bri_scaled ((bri * 32) / 100)
     """
     if not 0 <= brightness <= 100:
         raise ValueError("亮度必須在 0 到 100 之間")
-    bri = brightness
-    bri_scaled = (bri * 32) // 100
-    on_off = 1 if bri > 0 else 0
-    return bytearray([123, 255, 1, bri_scaled, bri, on_off, 255, 255, 191])
+    return _BRIGHTNESS_TABLE[brightness]
 
-def create_dmx_mode_command(mode: int) -> bytearray:
+@functools.lru_cache(maxsize=256)
+def create_dmx_mode_command(mode: int) -> bytes:
     """指令碼 3: 設定動態模式"""
-    return bytearray([123, 255, 3, mode, 255, 255, 255, 255, 191])
+    return _MODE_PREFIX + bytes((mode,)) + _MODE_SUFFIX
 
-def create_dmx_speed_command(speed: int) -> bytearray:
+def create_dmx_speed_command(speed: int) -> bytes:
     """指令碼 2: 設定模式速度 (0-100)"""
     if not 0 <= speed <= 100:
         raise ValueError("速度必須在 0 到 100 之間")
-    return bytearray([123, 255, 2, speed, 255, 1, 255, 255, 191]) # direction 暫定為 1
+    return _SPEED_TABLE[speed]
 
 # ----------------------------------------------------
 
@@ -70,12 +92,8 @@ async def test_device(address: str):
     logging.info(f"[*] 正在嘗試連接到 DMX 控制器: {address}...")
     try:
         # 增加 timeout 參數以避免長時間等待無響應的設備
+        # 進入 `async with` 即代表已連線；連線失敗會拋出 BleakError，由下方的 except 處理
         async with BleakClient(address, timeout=10.0) as client:
-            if not client.is_connected:
-                # 這個判斷理論上在 `async with` 成功後不會觸發，但作為雙重保險
-                logging.error(f"[!] 連接至 {address} 失敗。")
-                return
-
             logging.info(f"[+] 成功連接到 {address}！準備執行指令序列...")
             await asyncio.sleep(1)
 
@@ -138,6 +156,7 @@ async def main():
     await asyncio.gather(*tasks)
 
 if __name__ == "__main__":
+    install_uvloop()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -6,79 +6,209 @@
 # (at your option) any later version.
 
 import asyncio
+import functools
 import logging
 import json
 import os
+import re
+try:
+    import orjson
+except ImportError: # e.g. Android builds without an orjson recipe
+    orjson = None
 from kivy.app import App
+from kivy.clock import Clock
+from kivy.factory import Factory
+from kivy.lang import Builder
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.textinput import TextInput
 from kivy.uix.button import Button
-from kivy.uix.slider import Slider
 from kivy.uix.scrollview import ScrollView
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.uix.screenmanager import ScreenManager, Screen
 from kivy.utils import platform
 from kivy.core.window import Window
 
 # Import your original DMX class
-from DMX import DMXController
+from DMX import DEVICE_FILE_VERSION, DMXController, install_uvloop, normalize_device_data, snapshot_gatt
 from bleak import BleakScanner, BleakClient, BleakError
 
 # 設定存檔檔名 (於 DMXApp 中動態設定)
 DATA_FILE = "" 
 
+# DMX 控制器 (HM-10 類模組) 廣播的服務與寫入用特徵值
+DMX_SERVICE_UUID = "0000ffe0-0000-1000-8000-00805f9b34fb"
+DMX_CHAR_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
+
+# 掃描結果批次更新 UI 的週期 (秒) 與每次最多新增的列數
+SCAN_FLUSH_INTERVAL = 0.2
+SCAN_ROWS_PER_FLUSH = 20
+
+# Connect All 時每台設備的連線逾時 (秒)
+CONNECT_TIMEOUT = 8.0
+
+# Connect All 同時進行的連線數上限 (預設值；可在 App 設定檔 [ble] connect_concurrency 調整)
+# Android 約超過 7 條並行連線就容易失敗，Linux 上較強的藍牙 dongle 可調高到 16
+CONNECT_CONCURRENCY = 4
+
+# 即時顏色更新的最短發送間隔 (秒)
+COLOR_SEND_INTERVAL = 0.05
+
+# HEX 色碼輸入格式 (#RRGGBB，# 可省略)
+HEX_COLOR_RE = re.compile(r"#?([0-9A-Fa-f]{6})")
+
+# 裝置清單變更後延遲寫檔的檢查週期 (秒)
+SAVE_FLUSH_INTERVAL = 0.5
+
+# RSSI 顏色: 依 (> -90) + (> -70) 的結果索引 (弱 紅 / 中 黃 / 強 綠)
+_RSSI_COLORS = ((1, 0, 0, 1), (1, 1, 0, 1), (0, 1, 0, 1))
+
 logger = logging.getLogger(__name__)
 
+# ---------------------------------------------------------
+# JSON persistence helpers
+# ---------------------------------------------------------
+def dumps_json(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+def loads_json(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+@functools.lru_cache(maxsize=None)
+def default_device_list():
+    """Default MACs from DMX_test.py, imported at most once per process (empty if unavailable)"""
+    try:
+        from DMX_test import DEVICE_ADDRESS
+    except ImportError:
+        return ()
+    if isinstance(DEVICE_ADDRESS, str):
+        return (DEVICE_ADDRESS,)
+    return tuple(DEVICE_ADDRESS)
+
+def write_file_atomic(path, data: bytes):
+    """Write to a temp file and swap it in, so a crash never leaves a half-written file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def rssi_color(rssi):
+    return _RSSI_COLORS[(rssi > -90) + (rssi > -70)]
+
+# ---------------------------------------------------------
+# UI Helper: RecycleView list (only visible rows own widgets)
+# ---------------------------------------------------------
+def create_recycle_list(viewclass, row_height):
+    """Vertical RecycleView whose rows are driven by `rv.data` dicts"""
+    rv = RecycleView(viewclass=viewclass)
+    layout = RecycleBoxLayout(orientation='vertical', size_hint_y=None, spacing=5,
+                              default_size=(None, row_height), default_size_hint=(1, None))
+    layout.bind(minimum_height=layout.setter('height'))
+    rv.add_widget(layout)
+    return rv
+
 # ---------------------------------------------------------
 # UI Component: Single Device List Row (for Settings Page)
 # ---------------------------------------------------------
-class DeviceListRow(BoxLayout):
-    """Row displaying a single MAC address and a delete button"""
-    def __init__(self, mac_address, remove_callback, **kwargs):
+class DeviceListRow(RecycleDataViewBehavior, BoxLayout):
+    """Row displaying a single MAC address and a delete button
+    data: {"mac_address": str, "remove_callback": callable(mac)}"""
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.size_hint_y = None
         self.height = 50
-        self.mac_address = mac_address
+        self.mac_address = ""
+        self.remove_callback = None
         
-        # MAC 地址顯示
-        self.lbl_mac = Label(text=mac_address, size_hint_x=0.7, halign='left', valign='middle')
-        self.lbl_mac.bind(size=self.lbl_mac.setter('text_size')) # Ensure text aligns left
+        # MAC 地址顯示 (text_size is kept in on_size so the text aligns left)
+        self.lbl_mac = Label(size_hint_x=0.7, halign='left', valign='middle', shorten=True)
         self.add_widget(self.lbl_mac)
 
         # 刪除按鈕
         self.btn_remove = Button(text="Delete", size_hint_x=0.3, background_color=(1, 0.3, 0.3, 1))
-        self.btn_remove.bind(on_press=lambda x: remove_callback(self))
+        self.btn_remove.bind(on_press=lambda x: self.remove_callback(self.mac_address))
         self.add_widget(self.btn_remove)
 
+    def on_size(self, instance, size):
+        # Row-level default handler instead of one setter binding per label
+        self.lbl_mac.text_size = (size[0] * self.lbl_mac.size_hint_x, None)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.lbl_mac.text = data["mac_address"]
+        return super().refresh_view_attrs(rv, index, data)
+
 # ---------------------------------------------------------
 # UI Component: Scan Result Row
 # ---------------------------------------------------------
-class ScanResultRow(BoxLayout):
-    def __init__(self, device, rssi, add_callback, **kwargs):
+class ScanResultRow(RecycleDataViewBehavior, BoxLayout):
+    """Row for one scanned device. Views are recycled, so the button state lives in data:
+    {"device", "rssi", "add_callback": callable(device), "btn_text", "btn_disabled", "btn_color"}"""
+    def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.size_hint_y = None
         self.height = 60
-        self.device = device
-        self.add_callback = add_callback
+        self.device = None
+        self.add_callback = None
         
         # Icon/RSSI
-        rssi_color = (0, 1, 0, 1) if rssi > -70 else (1, 1, 0, 1) if rssi > -90 else (1, 0, 0, 1)
-        self.add_widget(Label(text=f"{rssi}dB", size_hint_x=0.15, color=rssi_color))
+        self.lbl_rssi = Label(size_hint_x=0.15)
+        self.add_widget(self.lbl_rssi)
         
         # Info
-        info_text = f"{device.name or 'Unknown'}\n{device.address}"
-        self.add_widget(Label(text=info_text, size_hint_x=0.55, halign='left', valign='middle'))
+        self.lbl_info = Label(size_hint_x=0.55, halign='left', valign='middle', shorten=True)
+        self.add_widget(self.lbl_info)
         
         # Add Button
         self.btn_add = Button(text="Add", size_hint_x=0.3, background_color=(0.2, 0.6, 1, 1))
         self.btn_add.bind(on_press=self.on_add_press)
         self.add_widget(self.btn_add)
 
+    def on_size(self, instance, size):
+        self.lbl_info.text_size = (size[0] * self.lbl_info.size_hint_x, None)
+
+    def refresh_view_attrs(self, rv, index, data):
+        rssi = data["rssi"]
+        device = data["device"]
+        self.lbl_rssi.text = f"{rssi}dB"
+        self.lbl_rssi.color = rssi_color(rssi)
+        self.lbl_info.text = f"{device.name or 'Unknown'}\n{device.address}"
+        self.btn_add.text = data["btn_text"]
+        self.btn_add.disabled = data["btn_disabled"]
+        self.btn_add.background_color = data["btn_color"]
+        return super().refresh_view_attrs(rv, index, data)
+
     def on_add_press(self, instance):
-        self.btn_add.text = "..."
-        self.btn_add.disabled = True
-        self.add_callback(self.device, self)
+        self.add_callback(self.device)
+
+# ---------------------------------------------------------
+# UI Components: Control Page building blocks
+# ---------------------------------------------------------
+# Declared once as KV rules (parsed at import) and instantiated through Factory:
+# DividerLabel is a grey separator line between control sections,
+# SliderRow a caption label above a slider (see ControlScreen.create_slider)
+Builder.load_string("""
+<DividerLabel@Label>:
+    size_hint_y: None
+    height: 20
+    text: "-----------------"
+    color: 0.5, 0.5, 0.5, 1
+
+<SliderRow@BoxLayout>:
+    orientation: 'vertical'
+    size_hint_y: None
+    height: 60
+    Label:
+        id: lbl
+    Slider:
+        id: slider
+""")
 
 # ---------------------------------------------------------
 # Page 1.5: Scan & Search (ScanScreen)
@@ -87,8 +217,11 @@ class ScanScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.app = App.get_running_app()
-        self.scanner = None
-        self.found_devices = {} # map address -> device
+        self._scanning = False # Subscribed to the app's shared scanner
+        self.found_devices = {} # map address -> (device, advertised service UUIDs)
+        self._pending_devices = {} # map address -> (device, rssi, service UUIDs), waiting to be shown
+        self._rows = {} # map address -> row dict inside self.rv.data
+        self._flush_ev = None
         
         # Main Layout
         layout = BoxLayout(orientation='vertical', padding=20, spacing=15)
@@ -110,34 +243,36 @@ class ScanScreen(Screen):
         layout.add_widget(self.status_label)
 
         # List
-        self.scroll = ScrollView()
-        self.list_layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=5)
-        self.list_layout.bind(minimum_height=self.list_layout.setter('height'))
-        self.scroll.add_widget(self.list_layout)
-        layout.add_widget(self.scroll)
+        self.rv = create_recycle_list(ScanResultRow, 60)
+        layout.add_widget(self.rv)
 
         self.add_widget(layout)
 
     def on_leave(self):
         # 確保在離開頁面時停止掃描
-        import asyncio
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.create_task(self.stop_scan())
+        loop = self.app.loop
+        if loop is not None and loop.is_running():
+            # on_leave may run outside the loop's thread depending on the async integration
+            loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self.stop_scan()))
 
     def go_back(self, instance):
         self.manager.transition.direction = 'right'
         self.manager.current = 'settings'
 
     def toggle_scan(self, instance):
-        if self.scanner:
-            self.stop_scan()
+        if self._scanning:
+            asyncio.create_task(self.stop_scan())
         else:
             self.start_scan()
 
     def start_scan(self):
-        self.list_layout.clear_widgets()
+        self.rv.data = []
+        self._rows = {}
         self.found_devices = {}
+        self._pending_devices = {}
+        # Detections are buffered and added to the list in batches
+        if self._flush_ev is None:
+            self._flush_ev = Clock.schedule_interval(self._flush_pending, SCAN_FLUSH_INTERVAL)
         self.btn_scan.text = "Stop"
         self.btn_scan.background_color = (0.8, 0.2, 0.2, 1)
         self.status_label.text = "Scanning..."
@@ -145,88 +280,109 @@ class ScanScreen(Screen):
         asyncio.create_task(self._async_scan())
 
     async def stop_scan(self):
-        if self.scanner:
-            scanner_to_stop = self.scanner
-            self.scanner = None
-            await scanner_to_stop.stop()
+        if self._scanning:
+            self._scanning = False
+            await self.app.unsubscribe_scan(self.device_detected)
+        if self._flush_ev is not None:
+            self._flush_ev.cancel()
+            self._flush_ev = None
+        self._pending_devices = {}
         self.btn_scan.text = "Start Scan"
         self.btn_scan.background_color = (0.2, 0.8, 0.2, 1)
         self.status_label.text = "Scan Stopped"
 
     async def _async_scan(self):
         try:
-            self.scanner = BleakScanner(detection_callback=self.device_detected)
-            await self.scanner.start()
+            self._scanning = True
+            await self.app.subscribe_scan(self.device_detected)
         except Exception as e:
-            self.status_label.text = f"Scan Error: {e}"
-            self.stop_scan()
+            await self.stop_scan()
+            self._post_ui(self._set_status, f"Scan Error: {e}")
 
     def device_detected(self, device, advertisement_data):
         # Filter Logic
         if device.address in self.found_devices:
             return
-        if device.address in self.app.saved_devices:
+        if device.address in self.app.saved_devices_set:
             return # Already saved
         if advertisement_data.rssi < -90:
             return # Too weak
-        
-        # DMX name check (simple heuristic) or Service UUID check
-        # Many HM-10/11 modules advertise FFE0 service. DMX uses FFE1 char inside FFE0 service usually.
-        is_candidate = False
-        if device.name and len(device.name) > 0:
-            is_candidate = True # Allow any named device for now, verify later
-        
-        # Example: Filter by specific service UUIDs if known (e.g. ['0000ffe0...'])
-        # if '0000ffe0-0000-1000-8000-00805f9b34fb' in advertisement_data.service_uuids:
-        #    is_candidate = True
-
-        if is_candidate:
-            self.found_devices[device.address] = device
-            # Update UI on main thread
-            # Since we are in async callback, we should use some thread-safe way if strictly needed, 
-            # but Kivy often handles this loosely or needs Clock.schedule_once. 
-            # For simplicity in this async loop, we append directly (watch out for thread issues if any).
-            row = ScanResultRow(device, advertisement_data.rssi, self.verify_and_add)
-            self.list_layout.add_widget(row)
 
-    def verify_and_add(self, device, row_widget):
-        asyncio.create_task(self._async_verify_and_add(device, row_widget))
-
-    async def _async_verify_and_add(self, device, row_widget):
-        self.status_label.text = f"Verifying {device.name}..."
-        
-        # Valid Characteristic UUID for DMX
-        DMX_CHAR_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
+        # The scanner is filtered on DMX_SERVICE_UUID, so every report is a candidate.
+        # Only buffer here (latest RSSI wins); rows are created by _flush_pending
+        self._pending_devices[device.address] = (device, advertisement_data.rssi, advertisement_data.service_uuids)
+
+    def _flush_pending(self, dt):
+        """Add buffered detections to the list, at most SCAN_ROWS_PER_FLUSH per tick"""
+        new_rows = []
+        while self._pending_devices and len(new_rows) < SCAN_ROWS_PER_FLUSH:
+            address = next(iter(self._pending_devices))
+            device, rssi, service_uuids = self._pending_devices.pop(address)
+            if address in self.found_devices:
+                continue
+            self.found_devices[address] = (device, service_uuids)
+            row = {
+                "device": device, "rssi": rssi, "add_callback": self.verify_and_add,
+                "btn_text": "Add", "btn_disabled": False, "btn_color": (0.2, 0.6, 1, 1),
+            }
+            self._rows[address] = row
+            new_rows.append(row)
+        if new_rows:
+            self.rv.data.extend(new_rows)
+
+    def _update_row(self, address, **changes):
+        """Change the button state of a scan row and redraw the visible views"""
+        row = self._rows.get(address)
+        if row is not None:
+            row.update(changes)
+            self.rv.refresh_from_data()
+
+    def verify_and_add(self, device):
+        self._update_row(device.address, btn_text="...", btn_disabled=True)
+        asyncio.create_task(self._async_verify_and_add(device))
+
+    async def _async_verify_and_add(self, device):
+        self._post_ui(self._set_status, f"Verifying {device.name}...")
+        _, adv_uuids = self.found_devices.get(device.address, (device, ()))
         
-        client = BleakClient(device, timeout=10.0)
         try:
-            await client.connect()
-            
-            # Check for characteristic
-            has_dmx = False
-            for service in client.services:
-                for char in service.characteristics:
-                    if char.uuid == DMX_CHAR_UUID:
-                        has_dmx = True
-                        break
-                if has_dmx: break
-            
-            await client.disconnect()
+            # An advertised FFE0 service is enough; only connect + discover when it wasn't advertised
+            has_dmx = DMX_SERVICE_UUID in (u.lower() for u in adv_uuids)
+            if not has_dmx:
+                # WinRT: let the OS answer from its GATT cache instead of re-reading the device
+                # async with disconnects even when the service lookup raises
+                async with BleakClient(device, timeout=10.0, winrt={"use_cached_services": True}) as client:
+                    svc = client.services.get_service(DMX_SERVICE_UUID)
+                    has_dmx = svc is not None and svc.get_characteristic(DMX_CHAR_UUID) is not None
+                    if has_dmx:
+                        # Keep the discovered GATT table so later connects can skip full discovery
+                        self.app.gatt_cache[device.address] = snapshot_gatt(client.services)
             
             if has_dmx:
-                self.status_label.text = f"Verified! Added {device.name}"
-                self.app.saved_devices.append(device.address)
-                self.app.save_devices_to_disk()
-                self.list_layout.remove_widget(row_widget)
+                self.app.add_saved(device.address)
+                self._post_ui(self._remove_row, device.address, f"Verified! Added {device.name}")
             else:
-                 self.status_label.text = "Failed: Not a DMX Controller"
-                 row_widget.btn_add.text = "Blocked"
-                 row_widget.btn_add.background_color = (0.5, 0.5, 0.5, 1)
+                self._post_ui(self._set_status, "Failed: Not a DMX Controller")
+                self._post_ui(self._update_row, device.address, btn_text="Blocked", btn_color=(0.5, 0.5, 0.5, 1))
 
         except Exception as e:
-            self.status_label.text = f"Verify Failed: {e}"
-            row_widget.btn_add.text = "Retry"
-            row_widget.btn_add.disabled = False
+            self._post_ui(self._set_status, f"Verify Failed: {e}")
+            self._post_ui(self._update_row, device.address, btn_text="Retry", btn_disabled=False)
+
+    # --- UI mutations, always run on the Kivy main loop via _post_ui ---
+
+    def _post_ui(self, func, *args, **kwargs):
+        """Run a widget mutation on the next Kivy frame instead of inside the BLE/asyncio callback"""
+        Clock.schedule_once(lambda dt: func(*args, **kwargs), 0)
+
+    def _set_status(self, text):
+        self.status_label.text = text
+
+    def _remove_row(self, address, status_text):
+        self.status_label.text = status_text
+        row = self._rows.pop(address, None)
+        if row is not None:
+            self.rv.data.remove(row)
 
 # ---------------------------------------------------------
 # Page 1: Device Settings & Connection (SettingsScreen)
@@ -256,16 +412,14 @@ class SettingsScreen(Screen):
         add_box.add_widget(btn_add)
         layout.add_widget(add_box)
 
-        # --- Device List (ScrollView) ---
+        # --- Device List (RecycleView) ---
         layout.add_widget(Label(text="Saved Device List:", size_hint_y=None, height=30, halign='left'))
         
-        self.scroll = ScrollView()
-        self.list_layout = BoxLayout(orientation='vertical', size_hint_y=None, spacing=5)
-        self.list_layout.bind(minimum_height=self.list_layout.setter('height'))
-        self.scroll.add_widget(self.list_layout)
+        self.rv = create_recycle_list(DeviceListRow, 50)
+        self._row_by_mac = {} # map MAC -> its dict in rv.data, so changes patch single rows
         
         # Add frame or background to separate list area (Optional)
-        layout.add_widget(self.scroll)
+        layout.add_widget(self.rv)
 
         # --- Bottom Connection Control Area ---
         status_box = BoxLayout(orientation='vertical', size_hint_y=None, height=100, spacing=5)
@@ -313,26 +467,33 @@ class SettingsScreen(Screen):
         self.update_connection_status()
 
     def refresh_list_ui(self):
-        """Redraw list from App data"""
-        self.list_layout.clear_widgets()
+        """Sync the list with App data, only touching rows that were added or removed"""
+        desired = self.app.saved_devices_set
+        for mac in self._row_by_mac.keys() - desired:
+            self._remove_row(mac)
         for mac in self.app.saved_devices:
-            row = DeviceListRow(mac, self.remove_device)
-            self.list_layout.add_widget(row)
+            if mac not in self._row_by_mac:
+                self._add_row(mac)
+
+    def _add_row(self, mac):
+        row = {"mac_address": mac, "remove_callback": self.remove_device}
+        self._row_by_mac[mac] = row
+        self.rv.data.append(row)
+
+    def _remove_row(self, mac):
+        row = self._row_by_mac.pop(mac, None)
+        if row is not None:
+            self.rv.data.remove(row)
 
     def add_device_from_input(self, instance):
         mac = self.input_mac.text.strip().upper()
-        if mac and mac not in self.app.saved_devices:
-            self.app.saved_devices.append(mac)
-            self.app.save_devices_to_disk() # Save to file
-            self.refresh_list_ui()
+        if mac and self.app.add_saved(mac):
+            self._add_row(mac)
             self.input_mac.text = ""
 
-    def remove_device(self, row_widget):
-        mac = row_widget.mac_address
-        if mac in self.app.saved_devices:
-            self.app.saved_devices.remove(mac)
-            self.app.save_devices_to_disk() # Save to file
-            self.list_layout.remove_widget(row_widget)
+    def remove_device(self, mac):
+        if self.app.remove_saved(mac):
+            self._remove_row(mac)
 
     def connect_all(self, instance):
         if not self.app.saved_devices:
@@ -345,51 +506,44 @@ class SettingsScreen(Screen):
         self.status_label.color = (1, 1, 0, 1)
         self.btn_connect.disabled = True
         
-        # Initialize controllers
-        # MODIFIED: targeted scan to find devices first instead of parallel implicit scanning
-        saved_macs = set(self.app.saved_devices)
-        found_devices_map = {}
-        
-        if saved_macs:
-            try:
-                # Scan for up to 3 seconds to find listed devices
-                scanner = BleakScanner()
-                
-                # Callback to capture targeted devices
-                def detection_callback(device, advertisement_data):
-                    if device.address in saved_macs:
-                        found_devices_map[device.address] = device
-                
-                scanner.register_detection_callback(detection_callback)
-                await scanner.start()
-                await asyncio.sleep(3.0)
-                await scanner.stop()
-            except Exception as e:
-                print(f"Pre-scan failed: {e}")
-        
-        self.app.controllers = []
-        for mac in self.app.saved_devices:
-            # Use found device object if available (faster/direct), else use string (implicit scan)
-            if mac in found_devices_map:
-                self.app.controllers.append(DMXController(found_devices_map[mac]))
-            else:
-                self.app.controllers.append(DMXController(mac))
+        # Initialize controllers: bleak resolves each MAC itself while connecting,
+        # so all devices are connected in parallel without a separate pre-scan
+        # A BLEDevice already reported by the shared scanner lets bleak skip its own lookup
+        self.app.controllers = [
+            DMXController(self.app.seen_devices.get(mac, mac), gatt_cache=self.app.gatt_cache.get(mac))
+            for mac in self.app.saved_devices
+        ]
+
+        # Bound how many connects hit the BLE adapter at once; the rest wait their turn
+        sem = asyncio.Semaphore(self.app.connect_concurrency())
 
         async def connect_single(c):
-            try:
-                await c.connect()
-                return c
-            except Exception as e:
-                print(f"Connection failed {c._device_address}: {e}")
-                return None
+            async with sem:
+                await asyncio.wait_for(c.connect(), timeout=CONNECT_TIMEOUT)
+            c.start_workers() # Per-device senders used by the control page
+            return c
 
         tasks = [connect_single(c) for c in self.app.controllers]
-        results = await asyncio.gather(*tasks)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Filter out successfully connected ones
-        connected = [c for c in results if c is not None]
+        connected = []
+        for c, result in zip(self.app.controllers, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Connection failed {c._device_address}: {result!r}")
+            else:
+                connected.append(c)
         self.app.controllers = connected
 
+        # Record the GATT table of devices connected for the first time
+        new_cache = False
+        for c in connected:
+            if c._device_address not in self.app.gatt_cache:
+                self.app.gatt_cache[c._device_address] = c.gatt_snapshot()
+                new_cache = True
+        if new_cache:
+            self.app.mark_devices_dirty()
+
         if connected:
             self.status_label.text = f"Connected ({len(connected)} devices)"
             self.status_label.color = (0, 1, 0, 1)
@@ -407,8 +561,11 @@ class SettingsScreen(Screen):
 
     async def _async_disconnect_all(self):
         self.status_label.text = "Disconnecting..."
-        tasks = [c.disconnect() for c in self.app.controllers]
-        await asyncio.gather(*tasks)
+        # One failed disconnect must not leave the others (or this page) stuck
+        results = await asyncio.gather(*(c.disconnect() for c in self.app.controllers), return_exceptions=True)
+        for c, result in zip(self.app.controllers, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Disconnect failed {c._device_address}: {result!r}")
         self.app.controllers = []
         
         self.status_label.text = "Disconnected"
@@ -473,10 +630,13 @@ class ControlScreen(Screen):
         super().__init__(**kwargs)
         self.app = App.get_running_app()
         self.updating_from_code = False # Flag to prevent recursive loops
+        self._last_rgb = (255, 255, 255) # Last color synced between sliders and HEX input
+        self._last_hex = "#FFFFFF"
         
-        # Rate limiting flags
-        self._sending_color_loop = False
-        self._color_update_pending = False
+        # Real-time color sending: slider/HEX changes set the event,
+        # the sender task wakes only then (created lazily, needs the running loop)
+        self._color_event = None
+        self._color_task = None
         
         # Main Layout
         root = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -498,9 +658,9 @@ class ControlScreen(Screen):
         self.inner_layout.add_widget(Label(text="Main Power", size_hint_y=None, height=30))
         power_box = BoxLayout(size_hint_y=None, height=50, spacing=20)
         self.btn_on = Button(text="Turn ON", background_color=(0, 1, 0, 1))
-        self.btn_on.bind(on_press=lambda x: self.send_command("on"))
+        self.btn_on.bind(on_press=functools.partial(self.send_command, "on"))
         self.btn_off = Button(text="Turn OFF", background_color=(1, 0, 0, 1))
-        self.btn_off.bind(on_press=lambda x: self.send_command("off"))
+        self.btn_off.bind(on_press=functools.partial(self.send_command, "off"))
         power_box.add_widget(self.btn_on)
         power_box.add_widget(self.btn_off)
         self.inner_layout.add_widget(power_box)
@@ -522,10 +682,10 @@ class ControlScreen(Screen):
         self.g_slider = self.create_slider(0, 255, 255, "Green (G)")
         self.b_slider = self.create_slider(0, 255, 255, "Blue (B)")
         
-        # Bind sliders to hex update
-        self.r_slider.bind(value=self.on_slider_change)
-        self.g_slider.bind(value=self.on_slider_change)
-        self.b_slider.bind(value=self.on_slider_change)
+        # Bind sliders to hex update (one shared bound handler for all three)
+        on_rgb = self.on_slider_change
+        for slider in (self.r_slider, self.g_slider, self.b_slider):
+            slider.bind(value=on_rgb)
 
         # Removed "Set Color" button for real-time control
         # btn_set_color = Button(text="Set Color", size_hint_y=None, height=50)
@@ -538,7 +698,7 @@ class ControlScreen(Screen):
         self.inner_layout.add_widget(Label(text="Overall Brightness", size_hint_y=None, height=30))
         self.bri_slider = self.create_slider(0, 100, 100, "Brightness %")
         btn_set_bri = Button(text="Set Brightness", size_hint_y=None, height=50)
-        btn_set_bri.bind(on_press=lambda x: self.send_command("brightness"))
+        btn_set_bri.bind(on_press=functools.partial(self.send_command, "brightness"))
         self.inner_layout.add_widget(btn_set_bri)
 
         self.inner_layout.add_widget(self.create_divider())
@@ -547,12 +707,12 @@ class ControlScreen(Screen):
         self.inner_layout.add_widget(Label(text="Dynamic Mode", size_hint_y=None, height=30))
         self.mode_slider = self.create_slider(1, 255, 1, "Mode ID")
         btn_set_mode = Button(text="Set Mode", size_hint_y=None, height=50)
-        btn_set_mode.bind(on_press=lambda x: self.send_command("mode"))
+        btn_set_mode.bind(on_press=functools.partial(self.send_command, "mode"))
         self.inner_layout.add_widget(btn_set_mode)
 
         self.speed_slider = self.create_slider(0, 100, 50, "Speed %")
         btn_set_speed = Button(text="Set Speed", size_hint_y=None, height=50)
-        btn_set_speed.bind(on_press=lambda x: self.send_command("speed"))
+        btn_set_speed.bind(on_press=functools.partial(self.send_command, "speed"))
         self.inner_layout.add_widget(btn_set_speed)
 
         scroll.add_widget(self.inner_layout)
@@ -561,17 +721,22 @@ class ControlScreen(Screen):
         self.add_widget(root)
 
     def create_divider(self):
-        return Label(size_hint_y=None, height=20, text="-----------------", color=(0.5,0.5,0.5,1))
+        return Factory.DividerLabel()
 
     def create_slider(self, min_val, max_val, default, label_prefix):
-        box = BoxLayout(orientation='vertical', size_hint_y=None, height=60)
-        lbl = Label(text=f"{label_prefix}: {int(default)}")
-        slider = Slider(min=min_val, max=max_val, value=default)
-        # Immediately update label text
-        slider.bind(value=lambda instance, val: setattr(lbl, 'text', f"{label_prefix}: {int(val)}"))
-        box.add_widget(lbl)
-        box.add_widget(slider)
-        self.inner_layout.add_widget(box)
+        row = Factory.SliderRow()
+        lbl, slider = row.ids.lbl, row.ids.slider
+        slider.range = (min_val, max_val)
+        slider.value = default
+
+        def refresh_label(dt=None):
+            lbl.text = f"{label_prefix}: {int(slider.value)}"
+
+        refresh_label()
+        # Value changes only fire a Clock trigger (no Python handler per touch move);
+        # the caption is re-rendered at most once per frame with the latest value
+        slider.bind(value=Clock.create_trigger(refresh_label))
+        self.inner_layout.add_widget(row)
         return slider
 
     def on_slider_change(self, instance, value):
@@ -579,108 +744,106 @@ class ControlScreen(Screen):
             return
             
         # Update HEX input from R/G/B sliders
-        r = int(self.r_slider.value)
-        g = int(self.g_slider.value)
-        b = int(self.b_slider.value)
+        rgb = (int(self.r_slider.value), int(self.g_slider.value), int(self.b_slider.value))
+        if rgb == self._last_rgb:
+            return # Sub-integer slider movement, nothing to update or send
+        self._last_rgb = rgb
         
         self.updating_from_code = True
-        self.input_hex.text = f"#{r:02X}{g:02X}{b:02X}"
+        self.input_hex.text = self._last_hex = "#{:02X}{:02X}{:02X}".format(*rgb)
         self.updating_from_code = False
         
         # Real-time update trigger
         self.trigger_color_update()
 
     def on_hex_change(self, instance, value):
-        if self.updating_from_code:
+        if self.updating_from_code or value == self._last_hex:
             return
+        self._last_hex = value
 
-        text = value.strip().upper()
-        if text.startswith("#"):
-            text = text[1:]
+        # Check if valid HEX (one C-level match + parse instead of per-character checks)
+        match = HEX_COLOR_RE.fullmatch(value.strip())
+        if match is None:
+            return
+        v = int(match.group(1), 16)
+        r, g, b = v >> 16, (v >> 8) & 0xFF, v & 0xFF
+        self._last_rgb = (r, g, b)
         
-        # Check if valid HEX
-        if len(text) == 6 and all(c in "0123456789ABCDEF" for c in text):
-            try:
-                r = int(text[0:2], 16)
-                g = int(text[2:4], 16)
-                b = int(text[4:6], 16)
-                
-                self.updating_from_code = True
-                self.r_slider.value = r
-                self.g_slider.value = g
-                self.b_slider.value = b
-                self.updating_from_code = False
-                
-                # Real-time update trigger
-                self.trigger_color_update()
-            except ValueError:
-                pass
+        self.updating_from_code = True
+        self.r_slider.value = r
+        self.g_slider.value = g
+        self.b_slider.value = b
+        self.updating_from_code = False
+        
+        # Real-time update trigger
+        self.trigger_color_update()
 
     def trigger_color_update(self):
-        """Handle rate-limited real-time updates"""
-        if self._sending_color_loop:
-            self._color_update_pending = True
-        else:
-            self._sending_color_loop = True
-            asyncio.create_task(self._process_color_loop())
+        """Wake the rate-limited sender, starting it on first use"""
+        if self._color_event is None:
+            self._color_event = asyncio.Event()
+        if self._color_task is None:
+            self._color_task = asyncio.create_task(self._process_color_loop())
+        self._color_event.set()
 
     async def _process_color_loop(self):
         while True:
-            # Send current slider values
+            # Sleeps here while nothing changes; changes made during a send
+            # or the rate-limit pause set the event again and are sent next round
+            await self._color_event.wait()
+            self._color_event.clear()
             controllers = self.app.controllers
             if controllers:
-                # Use internal async method to ensure we wait for BLE completion
-                # This prevents stacking commands if sending takes > 0.1s
-                await self._send_command("color", controllers)
+                # Each controller keeps only the newest queued color, so a slow
+                # device coalesces updates instead of stacking them or delaying the others
+                self._send_command("color", controllers)
             
-            # Rate limit (0.1s = 10Hz)
-            await asyncio.sleep(0.1)
-            
-            if not self._color_update_pending:
-                break
-            
-            # If pending update exists, reset flag and loop again
-            self._color_update_pending = False
-            
-        self._sending_color_loop = False
+            # Rate limit
+            await asyncio.sleep(COLOR_SEND_INTERVAL)
+
+    def on_leave(self):
+        """Stop the color sender while the page is hidden; the next change restarts it"""
+        if self._color_task is not None:
+            self._color_task.cancel()
+            self._color_task = None
 
     def go_back(self, instance):
         self.manager.transition.direction = 'right'
         self.manager.current = 'settings'
 
-    def send_command(self, cmd_type):
-        """Send command to all connected controllers in App"""
-        controllers = App.get_running_app().controllers
+    def send_command(self, cmd_type, instance=None):
+        """Send command to all connected controllers in App (usable directly as an on_press handler)"""
+        controllers = self.app.controllers
         if not controllers:
             return # Do nothing if not connected
 
-        asyncio.create_task(self._send_command(cmd_type, controllers))
-
-    async def _send_command(self, cmd_type, controllers):
-        """Modified to be more robust for direct calling without waiting"""
-        tasks = []
-        try:
-            if cmd_type == "on":
-                tasks = [c.set_power(True) for c in controllers]
-            elif cmd_type == "off":
-                tasks = [c.set_power(False) for c in controllers]
-            elif cmd_type == "color":
-                r, g, b = int(self.r_slider.value), int(self.g_slider.value), int(self.b_slider.value)
-                tasks = [c.set_static_color(r, g, b) for c in controllers]
-            elif cmd_type == "brightness":
-                val = int(self.bri_slider.value)
-                tasks = [c.set_brightness(val) for c in controllers]
-            elif cmd_type == "mode":
-                val = int(self.mode_slider.value)
-                tasks = [c.set_mode(val) for c in controllers]
-            elif cmd_type == "speed":
-                val = int(self.speed_slider.value)
-                tasks = [c.set_speed(val) for c in controllers]
-
-            if tasks:
-                await asyncio.gather(*tasks)
-        except Exception as e:
-            logger.error(f"Command send error: {e}")
+        self._send_command(cmd_type, controllers)
+
+    def _send_command(self, cmd_type, controllers):
+        """Hand the newest value to each controller's send queue and return immediately;
+        a stalled device only delays its own queue, never the UI or the other devices"""
+        if cmd_type == "on":
+            for c in controllers:
+                c.queue_power(True)
+        elif cmd_type == "off":
+            for c in controllers:
+                c.queue_power(False)
+        elif cmd_type == "color":
+            r, g, b = int(self.r_slider.value), int(self.g_slider.value), int(self.b_slider.value)
+            for c in controllers:
+                c.queue_color(r, g, b)
+        elif cmd_type == "brightness":
+            val = int(self.bri_slider.value)
+            for c in controllers:
+                c.queue_brightness(val)
+        elif cmd_type == "mode":
+            val = int(self.mode_slider.value)
+            for c in controllers:
+                c.queue_mode(val)
+        elif cmd_type == "speed":
+            val = int(self.speed_slider.value)
+            for c in controllers:
+                c.queue_speed(val)
 
 # ---------------------------------------------------------
 # Page 3: JSON Raw Editor (JsonEditorScreen)
@@ -719,11 +882,15 @@ class JsonEditorScreen(Screen):
 
     def on_enter(self):
         """讀取暫存檔內容到編輯器"""
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r') as f:
-                self.editor.text = f.read()
-        else:
+        # 先寫入尚在延遲中的裝置變更，編輯器才會看到最新的清單
+        self.app._flush_devices(0)
+        try:
+            with open(DATA_FILE, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
             self.editor.text = "[]"
+        else:
+            self.editor.text = raw.decode('utf-8')
 
     def go_back(self, instance):
         self.manager.transition.direction = 'right'
@@ -732,13 +899,13 @@ class JsonEditorScreen(Screen):
     def save_json(self, instance):
         try:
             # 驗證 JSON 語法
-            data = json.loads(self.editor.text)
-            if not isinstance(data, list):
-                raise ValueError("Content must be a JSON list of MAC addresses")
+            raw = self.editor.text.encode()
+            # 驗證內容格式，不合法的內容不寫入檔案
+            normalize_device_data(loads_json(raw))
             
-            # 寫入檔案
-            with open(DATA_FILE, 'w') as f:
-                f.write(self.editor.text)
+            # 寫入檔案 (延遲中的裝置變更先落地，再以編輯器內容覆蓋並重新載入)
+            self.app._flush_devices(0)
+            write_file_atomic(DATA_FILE, raw)
             
             # 同步更新 App 數據
             self.app.load_devices_from_disk()
@@ -751,7 +918,6 @@ class JsonEditorScreen(Screen):
             def reset_btn(dt):
                 self.btn_save.text = "Save"
                 self.btn_save.background_color = (0.2, 0.8, 0.2, 1)
-            from kivy.clock import Clock
             Clock.schedule_once(reset_btn, 2)
             print(f"Save error: {e}")
 
@@ -762,10 +928,29 @@ class DMXApp(App):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.controllers = [] # Store connected DMXController objects
+        self.loop = None # asyncio loop driving async_run(), captured in build()
         self.saved_devices = [] # Store MAC address strings
+        self.saved_devices_set = set() # Same MACs, for O(1) membership checks (e.g. per advertisement)
+        self.gatt_cache = {} # MAC -> [{"s": service, "c": char, "h": handle}, ...]
+        self._save_dirty = False # saved_devices / gatt_cache changed but not yet written
+        # One BleakScanner shared by every page; it runs while anyone is subscribed
+        self.scanner = None
+        self._adv_subscribers = set()
+        self.seen_devices = {} # address -> BLEDevice last reported by the shared scanner
+
+    def build_config(self, config):
+        config.setdefaults('ble', {'connect_concurrency': CONNECT_CONCURRENCY})
+
+    def connect_concurrency(self):
+        """Max parallel connects for Connect All, from the app config (at least 1)"""
+        try:
+            return max(1, self.config.getint('ble', 'connect_concurrency'))
+        except ValueError:
+            return CONNECT_CONCURRENCY
 
     def build(self):
         global DATA_FILE
+        self.loop = asyncio.get_running_loop()
         # 如果是 Android，使用私有資料夾；否則（如 Windows）優先使用程式同目錄
         if platform == 'android':
             DATA_FILE = os.path.join(self.user_data_dir, "dmx_devices.json")
@@ -798,57 +983,131 @@ class DMXApp(App):
             ], callback)
         
         self.load_devices_from_disk()
+        Clock.schedule_interval(self._flush_devices, SAVE_FLUSH_INTERVAL)
 
     def load_devices_from_disk(self):
         """Load device list from JSON"""
-        if os.path.exists(DATA_FILE):
+        self._save_dirty = False # Disk content replaces any unsaved change
+        try:
+            with open(DATA_FILE, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            # If no save file, try loading defaults from DMX_test.py
+            self.saved_devices = list(default_device_list())
+            self.gatt_cache = {}
+            # Automatically save the defaults to create the file
+            if self.saved_devices:
+                self.save_devices_to_disk()
+        else:
             try:
-                with open(DATA_FILE, 'r') as f:
-                    self.saved_devices = json.load(f)
+                self._apply_device_data(loads_json(raw))
             except Exception as e:
                 logger.error(f"Failed to load save file: {e}")
                 self.saved_devices = []
-        else:
-            # If no save file, try loading defaults from DMX_test.py
-            try:
-                from DMX_test import DEVICE_ADDRESS
-                if isinstance(DEVICE_ADDRESS, list):
-                    self.saved_devices = DEVICE_ADDRESS
-                elif isinstance(DEVICE_ADDRESS, str):
-                    self.saved_devices = [DEVICE_ADDRESS]
-                
-                # Automatically save the defaults to create the file
-                if self.saved_devices:
-                    self.save_devices_to_disk()
-            except ImportError:
-                self.saved_devices = []
+                self.gatt_cache = {}
+        self.saved_devices_set = set(self.saved_devices)
+
+    def add_saved(self, mac):
+        """Add a MAC to the saved list; returns False if it was already saved"""
+        if mac in self.saved_devices_set:
+            return False
+        self.saved_devices.append(mac)
+        self.saved_devices_set.add(mac)
+        self.mark_devices_dirty() # Saved to file on the next flush
+        return True
+
+    def remove_saved(self, mac):
+        """Remove a MAC from the saved list; returns False if it was not saved"""
+        if mac not in self.saved_devices_set:
+            return False
+        self.saved_devices.remove(mac)
+        self.saved_devices_set.discard(mac)
+        self.mark_devices_dirty()
+        return True
+
+    def _apply_device_data(self, data):
+        """Accept both the legacy MAC list and the versioned {"version", "devices"} format"""
+        self.saved_devices, self.gatt_cache = normalize_device_data(data)
 
     def save_devices_to_disk(self):
-        """Save device list to JSON"""
+        """Save device list (and each device's GATT cache) to JSON"""
+        data = {
+            "version": DEVICE_FILE_VERSION,
+            "devices": [{"mac": mac, "gatt": self.gatt_cache.get(mac, [])} for mac in self.saved_devices],
+        }
+        self._save_dirty = False
         try:
-            with open(DATA_FILE, 'w') as f:
-                json.dump(self.saved_devices, f)
+            write_file_atomic(DATA_FILE, dumps_json(data))
         except Exception as e:
             logger.error(f"Failed to save file: {e}")
 
+    def mark_devices_dirty(self):
+        """Schedule a save; bursts of changes are written once by _flush_devices"""
+        self._save_dirty = True
+
+    def _flush_devices(self, dt):
+        if self._save_dirty:
+            self.save_devices_to_disk()
+
+    def _dispatch_adv(self, device, advertisement_data):
+        self.seen_devices[device.address] = device
+        for callback in list(self._adv_subscribers):
+            callback(device, advertisement_data)
+
+    async def subscribe_scan(self, callback):
+        """Register a detection callback, starting the shared scanner for the first subscriber"""
+        self._adv_subscribers.add(callback)
+        if self.scanner is None:
+            # Let the OS filter by the DMX service so unrelated advertisements never reach Python
+            self.scanner = BleakScanner(
+                detection_callback=self._dispatch_adv,
+                service_uuids=[DMX_SERVICE_UUID],
+                scanning_mode="active",
+            )
+            try:
+                await self.scanner.start()
+            except Exception:
+                self.scanner = None
+                self._adv_subscribers.discard(callback)
+                raise
+
+    async def unsubscribe_scan(self, callback):
+        """Remove a detection callback, stopping the shared scanner after the last one leaves"""
+        self._adv_subscribers.discard(callback)
+        if not self._adv_subscribers and self.scanner is not None:
+            scanner, self.scanner = self.scanner, None
+            await scanner.stop()
+
     # Ensure disconnection on exit
     def on_stop(self):
-        asyncio.create_task(self.disconnect_all_on_exit())
+        # BLE disconnects run in __main__ after async_run() returns, on the same loop
+        self._flush_devices(0)
 
     async def disconnect_all_on_exit(self):
         if self.controllers:
-            tasks = [c.disconnect() for c in self.controllers]
-            await asyncio.gather(*tasks)
+            # One device already gone must not stop the others from disconnecting
+            await asyncio.gather(*(c.disconnect() for c in self.controllers), return_exceptions=True)
+            self.controllers = []
 
 if __name__ == "__main__":
-    loop = asyncio.new_event_loop()
+    if platform != 'android': # uvloop has no Android build; keep the default asyncio loop there
+        install_uvloop()
+    loop = asyncio.new_event_loop() # Created through the (uvloop) policy when installed
     asyncio.set_event_loop(loop)
+    # BLE deliberately shares this loop with Kivy instead of a separate IO thread:
+    # slider handlers only hand values to DMXController.queue_* (no task per event),
+    # writes are awaited I/O that yields between frames, and bleak's clients and
+    # scanner are bound to the loop they were created on, so a second loop would
+    # force every connect/scan/status update through thread hand-offs (and the GIL
+    # keeps the Python side of a write from running in parallel anyway)
 
     app = DMXApp()
 
     try:
-        loop.run_until_complete(app.async_run())
+        loop.run_until_complete(app.async_run(async_lib='asyncio'))
     except KeyboardInterrupt:
         pass
     finally:
+        # Run the disconnects to completion before the loop is closed
+        loop.run_until_complete(app.disconnect_all_on_exit())
         loop.close()
\ No newline at end of file
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from DMX import DEVICE_FILE_VERSION, normalize_device_data, snapshot_gatt
+
+GATT = [{"s": "0000ffe0-0000-1000-8000-00805f9b34fb", "c": "0000ffe1-0000-1000-8000-00805f9b34fb", "h": 17}]
+
+def test_legacy_mac_list():
+    assert normalize_device_data(["AA:BB:CC:DD:EE:01", "AA:BB:CC:DD:EE:02"]) == (
+        ["AA:BB:CC:DD:EE:01", "AA:BB:CC:DD:EE:02"], {})
+
+def test_legacy_list_of_dicts_drops_gatt():
+    data = [{"mac": "AA:BB:CC:DD:EE:01", "gatt": GATT}]
+    assert normalize_device_data(data) == (["AA:BB:CC:DD:EE:01"], {})
+
+def test_versioned_file_keeps_gatt():
+    data = {"version": DEVICE_FILE_VERSION, "devices": [
+        {"mac": "AA:BB:CC:DD:EE:01", "gatt": GATT},
+        {"mac": "AA:BB:CC:DD:EE:02", "gatt": []},
+    ]}
+    assert normalize_device_data(data) == (
+        ["AA:BB:CC:DD:EE:01", "AA:BB:CC:DD:EE:02"], {"AA:BB:CC:DD:EE:01": GATT})
+
+def test_other_version_drops_gatt():
+    data = {"version": DEVICE_FILE_VERSION + 1, "devices": [{"mac": "AA:BB:CC:DD:EE:01", "gatt": GATT}]}
+    assert normalize_device_data(data) == (["AA:BB:CC:DD:EE:01"], {})
+
+def test_devices_as_mac_strings_and_duplicates():
+    data = {"devices": ["AA:BB:CC:DD:EE:01", {"mac": "AA:BB:CC:DD:EE:02"}, "AA:BB:CC:DD:EE:01"]}
+    assert normalize_device_data(data) == (["AA:BB:CC:DD:EE:01", "AA:BB:CC:DD:EE:02"], {})
+
+def test_empty_forms():
+    assert normalize_device_data([]) == ([], {})
+    assert normalize_device_data({}) == ([], {})
+
+@pytest.mark.parametrize("data", [
+    3,
+    "AA:BB:CC:DD:EE:01",
+    None,
+    {"devices": "AA:BB:CC:DD:EE:01"},
+    [1],
+    [None],
+    [{"gatt": GATT}],
+    [{"mac": 5}],
+    [{"mac": "AA:BB:CC:DD:EE:01", "gatt": "x"}],
+])
+def test_rejects_invalid(data):
+    with pytest.raises(ValueError):
+        normalize_device_data(data)
+
+class _Char:
+    def __init__(self, uuid, handle):
+        self.uuid, self.handle = uuid, handle
+
+class _Service:
+    def __init__(self, uuid, characteristics):
+        self.uuid, self.characteristics = uuid, characteristics
+
+def test_saved_file_round_trip():
+    """A file written the way DMXApp.save_devices_to_disk does loads back unchanged"""
+    gatt = snapshot_gatt([_Service(GATT[0]["s"], [_Char(GATT[0]["c"], GATT[0]["h"])])])
+    saved = {"version": DEVICE_FILE_VERSION, "devices": [
+        {"mac": "AA:BB:CC:DD:EE:01", "gatt": gatt},
+        {"mac": "AA:BB:CC:DD:EE:02", "gatt": []},
+    ]}
+    assert normalize_device_data(json.loads(json.dumps(saved))) == (
+        ["AA:BB:CC:DD:EE:01", "AA:BB:CC:DD:EE:02"], {"AA:BB:CC:DD:EE:01": GATT})
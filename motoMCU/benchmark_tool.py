@@ -1,72 +1,138 @@
 import sys
 import time
-import threading
-import urllib.request
-import json
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import itertools
+import statistics
+from array import array
+import http.client
+try:
+    import numpy as np
+except ImportError: # Stats fall back to pure Python
+    np = None
 
 # Default Target
 TARGET_IP = "192.168.9.2"
-CONCURRENCY = 10
+HTTP_PORT = 80
+# The ESP8266 serves one request at a time, so a few in-flight requests already
+# keep it busy; raising this mostly measures client-side queueing, not the server
+CONCURRENCY = 4
 DURATION = 10 # seconds per test
+REQUEST_TIMEOUT = 5 # seconds per request (connect + response)
+EXPECTED_RPS = 100 # sizes the per-worker sample buffers (they grow if exceeded)
 
-def get_url(path):
-    return f"http://{TARGET_IP}{path}"
+def http_get(host, path, timeout):
+    """One blocking GET through http.client (host/path already split, no URL parsing).
+    Returns the status code; raises OSError / http.client.HTTPException on failure."""
+    conn = http.client.HTTPConnection(host, HTTP_PORT, timeout=timeout)
+    try:
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+async def fetch_once(host, path):
+    """One GET on a fresh connection; returns the status code.
+    The ESP8266 server answers every request with Connection: close, so there is no
+    connection to reuse: ask for close as well and read the response until EOF."""
+    reader, writer = await asyncio.open_connection(host, HTTP_PORT)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed before response")
+        code = int(status_line.split()[1])
+        await reader.read() # Headers + body run until the server closes the socket
+        return code
+    finally:
+        writer.close()
+
+class WorkerSamples:
+    """Preallocated per-worker sample buffers: status codes (0 = error) and latencies in seconds"""
+    __slots__ = ("codes", "latencies", "count")
+
+    def __init__(self, capacity):
+        self.codes = array('H', bytes(2 * capacity))
+        self.latencies = array('d', bytes(8 * capacity))
+        self.count = 0
+
+    def add(self, code, latency):
+        i = self.count
+        if i == len(self.codes): # Buffer full, double it
+            self.codes.extend(self.codes)
+            self.latencies.extend(self.latencies)
+        self.codes[i] = code
+        self.latencies[i] = latency
+        self.count = i + 1
+
+    def used(self):
+        """(codes, latencies) of the filled part only"""
+        return self.codes[:self.count], self.latencies[:self.count]
 
-def fetch_worker(url, results, stop_event):
-    while not stop_event.is_set():
-        start = time.time()
+async def fetch_worker(host, path, samples):
+    """Request `path` back to back until cancelled, one connection per request"""
+    perf_counter = time.perf_counter
+    while True:
+        start = perf_counter()
         try:
-            with urllib.request.urlopen(url, timeout=5) as response:
-                _ = response.read()
-                code = response.getcode()
-                latency = time.time() - start
-                results.append({"code": code, "latency": latency, "error": None})
-        except Exception as e:
-            latency = time.time() - start
-            results.append({"code": 0, "latency": latency, "error": str(e)})
+            code = await asyncio.wait_for(fetch_once(host, path), REQUEST_TIMEOUT)
+        except Exception:
+            code = 0
+        samples.add(code, perf_counter() - start)
+
+async def run_workers(host, path, duration, concurrency):
+    """Run `concurrency` workers for `duration` seconds; returns their WorkerSamples"""
+    capacity = max(16, int(duration * EXPECTED_RPS * 2 / concurrency))
+    workers = [WorkerSamples(capacity) for _ in range(concurrency)]
+    tasks = [asyncio.create_task(fetch_worker(host, path, samples)) for samples in workers]
+    # One timed wait, then stop everything at once; requests still in flight are dropped
+    await asyncio.sleep(duration)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return workers
+
+def latency_stats(codes, latencies):
+    """(success count, avg, min, max, (p50, p95, p99)) over the latencies of HTTP 200 responses"""
+    if np is not None:
+        ok = np.frombuffer(latencies, dtype=np.float64)[np.frombuffer(codes, dtype=np.uint16) == 200]
+        if ok.size == 0:
+            return 0, 0, 0, 0, (0, 0, 0)
+        return ok.size, ok.mean(), ok.min(), ok.max(), tuple(np.quantile(ok, [0.5, 0.95, 0.99]))
+    ok = [lat for code, lat in zip(codes, latencies) if code == 200]
+    if not ok:
+        return 0, 0, 0, 0, (0, 0, 0)
+    if len(ok) == 1:
+        percentiles = (ok[0],) * 3
+    else:
+        # 'inclusive' interpolates the same way as np.quantile's default
+        cuts = statistics.quantiles(ok, n=100, method='inclusive')
+        percentiles = (cuts[49], cuts[94], cuts[98])
+    return len(ok), sum(ok) / len(ok), min(ok), max(ok), percentiles
 
 def run_benchmark(name, path, duration, concurrency):
     print(f"\n--- Benchmarking: {name} ({path}) ---")
     print(f"Concurrency: {concurrency}, Duration: {duration}s")
     
-    stop_event = threading.Event()
-    results = []
-    
-    url = get_url(path)
-    
     # Warmup
     print("Warming up...")
     try:
-        with urllib.request.urlopen(url, timeout=5) as response:
-            pass
-    except:
+        http_get(TARGET_IP, path, REQUEST_TIMEOUT)
+    except (OSError, http.client.HTTPException):
         print("Warmup failed! Is the device online?")
         return
 
-    threads = []
-    for _ in range(concurrency):
-        t = threading.Thread(target=fetch_worker, args=(url, results, stop_event))
-        t.start()
-        threads.append(t)
-        
-    start_time = time.time()
-    while time.time() - start_time < duration:
-        time.sleep(0.1)
-        
-    stop_event.set()
-    for t in threads:
-        t.join()
+    # All workers share one event loop instead of one OS thread each
+    workers = asyncio.run(run_workers(TARGET_IP, path, duration, concurrency))
         
     # Analysis
-    total_reqs = len(results)
-    success_reqs = len([r for r in results if r["code"] == 200])
-    failed_reqs = len([r for r in results if r["code"] != 200])
-    
-    latencies = [r["latency"] for r in results if r["code"] == 200]
-    avg_latency = sum(latencies) / len(latencies) if latencies else 0
-    max_latency = max(latencies) if latencies else 0
-    min_latency = min(latencies) if latencies else 0
+    codes = array('H', itertools.chain.from_iterable(w.used()[0] for w in workers))
+    all_latencies = array('d', itertools.chain.from_iterable(w.used()[1] for w in workers))
+    total_reqs = len(codes)
+    success_reqs, avg_latency, min_latency, max_latency, (p50, p95, p99) = latency_stats(codes, all_latencies)
+    failed_reqs = total_reqs - success_reqs
     
     rps = success_reqs / duration
     
@@ -75,6 +141,7 @@ def run_benchmark(name, path, duration, concurrency):
     print(f"Failed: {failed_reqs}")
     print(f"RPS: {rps:.2f}")
     print(f"Latency (Avg/Min/Max): {avg_latency*1000:.2f}ms / {min_latency*1000:.2f}ms / {max_latency*1000:.2f}ms")
+    print(f"Latency (p50/p95/p99): {p50*1000:.2f}ms / {p95*1000:.2f}ms / {p99*1000:.2f}ms")
 
 def main():
     global TARGET_IP
@@ -86,7 +153,7 @@ def main():
     
     print("Checking connection...")
     try:
-        urllib.request.urlopen(get_url("/"), timeout=2)
+        http_get(TARGET_IP, "/", 2)
         print("Device Online.")
     except Exception as e:
         print(f"Could not connect to device: {e}")
@@ -2,6 +2,8 @@ import sys
 import os
 import subprocess
 import time
+import shutil
+import socket
 # Copyright (C) 2026 eddie772tw
 # This file is part of motoPlayer.
 # motoPlayer is free software: you can redistribute it and/or modify
@@ -16,6 +18,10 @@ import serial.tools.list_ports
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 MICROPYTHON_BIN = os.path.join(PROJECT_ROOT, "micropython", "firmware.bin")
 MICROPYTHON_MAIN = os.path.join(PROJECT_ROOT, "micropython", "main.py")
+# 有 mpy-cross 時，main.py 會先編譯成 MICROPYTHON_MODULE.mpy，再由這個小入口檔 import 執行
+MICROPYTHON_ENTRY = os.path.join(PROJECT_ROOT, "micropython", "mpy_entry.py")
+MICROPYTHON_MODULE = "moto_main"
+MICROPYTHON_BUILD_DIR = os.path.join(PROJECT_ROOT, "micropython", "build")
 CPP_BIN_DIR = os.path.join(PROJECT_ROOT, ".pio", "build", "nodemcuv2")
 BENCHMARK_TOOL = os.path.join(PROJECT_ROOT, "benchmark_tool.py")
 
@@ -44,24 +50,58 @@ def run_command(cmd, cwd=None, ignore_error=False):
             sys.exit(1)
         return False
 
+def is_online(ip, port=80, timeout=0.5):
+    """裝置的 HTTP 埠能否建立 TCP 連線 (在本行程內檢查，不另外啟動 Python)"""
+    try:
+        with socket.create_connection((ip, port), timeout):
+            return True
+    except OSError:
+        return False
+
 def wait_for_online(ip, timeout=30):
     print(f"Waiting for device ({ip}) to come online...", end="", flush=True)
     start = time.time()
+    polls = 0
     while time.time() - start < timeout:
-        # Use benchmark tool's check or simple ping/request
-        # Simplest is just ping, but let's try to wget root
-        try:
-            subprocess.check_output(f"python \"{BENCHMARK_TOOL}\" {ip} --check-only", shell=True, stderr=subprocess.STDOUT)
+        if is_online(ip):
             print(" Online!")
             return True
-        except subprocess.CalledProcessError:
-            pass
         
-        time.sleep(1)
-        print(".", end="", flush=True)
+        time.sleep(0.25)
+        polls += 1
+        if polls % 4 == 0: # Keep printing one dot per second
+            print(".", end="", flush=True)
     print(" Timeout!")
     return False
 
+def build_mpy():
+    """用 mpy-cross 把 main.py 預先編譯成 bytecode，省去裝置開機時的解析/編譯與其佔用的 heap。
+    回傳要上傳的 [(本機檔案, 裝置上檔名), ...]；找不到 mpy-cross 時照舊上傳 main.py 原始碼。
+    注意: mpy-cross 版本需與燒錄的 MicroPython 韌體相符。"""
+    if shutil.which("mpy-cross") is None:
+        print("mpy-cross not found, uploading main.py as source.")
+        return [(MICROPYTHON_MAIN, "main.py")]
+
+    os.makedirs(MICROPYTHON_BUILD_DIR, exist_ok=True)
+    mpy_path = os.path.join(MICROPYTHON_BUILD_DIR, MICROPYTHON_MODULE + ".mpy")
+    run_command(f"mpy-cross -O3 -march=xtensa -o \"{mpy_path}\" \"{MICROPYTHON_MAIN}\"")
+    return [(mpy_path, MICROPYTHON_MODULE + ".mpy"), (MICROPYTHON_ENTRY, "main.py")]
+
+def upload_file(port, local_path, remote_name):
+    # ampy needs a bit of reset sometimes, or just try put
+    # We allow retries for ampy
+    for i in range(3):
+        try:
+            # Set environment variable for ampy port or use -p
+            # ampy -p COMx put ...
+            # We might need to enforce raw mode or delay
+            run_command(f"ampy -p {port} -d 1.5 put \"{local_path}\" {remote_name}", ignore_error=False)
+            return True
+        except:
+            print("Retrying upload...")
+            time.sleep(2)
+    return False
+
 def test_cpp(port):
     print("\n=== Testing C++ Firmware ===")
     
@@ -96,28 +136,15 @@ def test_mp(port):
     print("Writing firmware...")
     run_command(f"esptool.py --port {port} --baud {DEFAULT_BAUD} write_flash --flash_size=detect 0 \"{MICROPYTHON_BIN}\"")
     
-    # 2. Upload Code
+    # 2. Upload Code (precompiled to .mpy when mpy-cross is available)
+    uploads = build_mpy()
     print("Uploading main.py...")
     # Give it a moment to boot after flash
     time.sleep(3)
-    # ampy needs a bit of reset sometimes, or just try put
-    # We allow retries for ampy
-    success = False
-    for i in range(3):
-        try:
-            # Set environment variable for ampy port or use -p
-            # ampy -p COMx put ...
-            # We might need to enforce raw mode or delay
-            run_command(f"ampy -p {port} -d 1.5 put \"{MICROPYTHON_MAIN}\" main.py", ignore_error=False)
-            success = True
-            break
-        except:
-            print("Retrying upload...")
-            time.sleep(2)
-    
-    if not success:
-        print("[ERROR] Failed to upload main.py")
-        sys.exit(1)
+    for local_path, remote_name in uploads:
+        if not upload_file(port, local_path, remote_name):
+            print(f"[ERROR] Failed to upload {remote_name}")
+            sys.exit(1)
         
     # 3. Reset
     print("Resetting board...")
@@ -8,7 +8,7 @@
 import machine
 import network
 import uasyncio as asyncio
-import ujson
+import ubinascii
 import time
 import gc
 
@@ -29,8 +29,11 @@ PIN_LED_B = 16
 
 UNO_I2C_ADDRESS = 8
 I2C_CHECK_INTERVAL_MS = 500
+ACK_FLASH_MS = 10 # I2C 收發成功時 ACK 閃燈的長度
 WIFI_TIMEOUT_MS = 15000
 MDNS_HOSTNAME = "motoplayer"
+GC_CHECK_INTERVAL_S = 5
+GC_LOW_MEM_BYTES = 8192 # 剩餘 heap 低於此值才主動 gc.collect()
 
 # WiFi Credentials (from main.cpp)
 STA_SSID = "motoplayer"
@@ -51,8 +54,25 @@ current_humidity = 0.0
 light_level = 0
 last_sensor_read_millis = 0
 
+# /api/sensors 的 JSON 快取 (bytes)；上面任一數值變動時設回 None，下次請求再重新序列化
+sensor_json_cache = None
+
 # LED State
-blink_task_ref = None
+# 持續閃爍中的 LED 與週期，以及目前的亮/滅狀態 (由 led_task 切換)
+blink_leds = ()
+blink_interval_ms = 0
+blink_state = False
+blink_next_ms = 0 # ticks_ms 時間點: 下一次切換
+# ACK 閃燈: 目前亮著、等 led_task 熄滅的 LED
+ack_leds = []
+# LED 狀態有變動時 set，喚醒 led_task
+led_event = asyncio.Event()
+
+# I2C 收發用的預先配置緩衝區 (每個週期不再配置新物件)
+I2C_BUF = bytearray(10)
+I2C_MV = memoryview(I2C_BUF)
+CMD_BUF = bytearray(2)
+CMD_MV = memoryview(CMD_BUF)
 
 # Hardware Objects
 i2c = None
@@ -83,65 +103,85 @@ def setup_hardware():
     wlan.active(True)
     wlan.config(dhcp_hostname=MDNS_HOSTNAME) # Attempt to set hostname
 
+def leds_for(pin):
+    """'g' / 'b' / 'a' -> 對應的 LED Pin tuple"""
+    pin = pin.lower()
+    if pin == 'g':
+        return (led_g,)
+    if pin == 'b':
+        return (led_b,)
+    if pin == 'a':
+        return (led_g, led_b)
+    return ()
+
+def stop_blinking():
+    global blink_leds
+    blink_leds = ()
+    led_event.set()
+
 def set_led(pin, status):
     # status: True (ON) or False (OFF) in logical sense
     # C++: status==HIGH -> output=LOW. 
     val = 0 if status else 1
     
-    global blink_task_ref
-    if blink_task_ref:
-        blink_task_ref.cancel()
-        blink_task_ref = None
-
-    if pin.lower() == 'g':
-        led_g.value(val)
-    elif pin.lower() == 'b':
-        led_b.value(val)
-    elif pin.lower() == 'a':
-        led_g.value(val)
-        led_b.value(val)
+    stop_blinking()
+    for l in leds_for(pin):
+        l.value(val)
 
 def set_solid_led_color(g_on, b_on):
-    global blink_task_ref
-    if blink_task_ref:
-        blink_task_ref.cancel()
-        blink_task_ref = None
+    stop_blinking()
         
     led_g.value(0 if g_on else 1)
     led_b.value(0 if b_on else 1)
 
-async def blink_led_task(pin, interval_ms):
-    state = True # Start ON
-    t_sec = interval_ms / 1000.0
-    
-    target_leds = []
-    if pin.lower() == 'g' or pin.lower() == 'a':
-        target_leds.append(led_g)
-    if pin.lower() == 'b' or pin.lower() == 'a':
-        target_leds.append(led_b)
-        
-    try:
-        while True:
-            val = 0 if state else 1
-            for l in target_leds:
-                l.value(val)
-            state = not state
-            await asyncio.sleep(t_sec)
-    except asyncio.CancelledError:
-        pass
-
 def start_blinking(pin, interval_ms):
-    global blink_task_ref
-    if blink_task_ref:
-        blink_task_ref.cancel()
-    blink_task_ref = asyncio.create_task(blink_led_task(pin, interval_ms))
+    global blink_leds, blink_interval_ms, blink_state, blink_next_ms
+    blink_leds = leds_for(pin)
+    blink_interval_ms = interval_ms
+    blink_state = False # 第一次切換為 ON
+    blink_next_ms = time.ticks_ms() # 立即切換
+    led_event.set()
+
+def flash_led(led):
+    """短暫點亮 LED 作為 ACK；立即返回，由 led_task 在 ACK_FLASH_MS 後熄燈 (不阻塞呼叫端)"""
+    led.value(0) # ON
+    if led not in ack_leds:
+        ack_leds.append(led)
+    led_event.set()
+
+async def led_task():
+    """唯一負責 LED 時序的背景任務: ACK 閃燈與持續閃爍都在這裡處理。
+    其他程式只改狀態並 set led_event，不會為了 LED 等待或建立新任務。"""
+    global blink_state, blink_next_ms
+    while True:
+        led_event.clear()
+        if ack_leds:
+            await asyncio.sleep_ms(ACK_FLASH_MS)
+            while ack_leds:
+                ack_leds.pop().value(1) # OFF
+            continue
+        if blink_leds:
+            now = time.ticks_ms()
+            if time.ticks_diff(now, blink_next_ms) >= 0:
+                blink_state = not blink_state
+                val = 0 if blink_state else 1
+                for l in blink_leds:
+                    l.value(val)
+                blink_next_ms = time.ticks_add(now, blink_interval_ms)
+            try:
+                # 等到下一次切換，或狀態改變 (停止/改閃/ACK) 時提早醒來；提早醒來不會打亂閃爍節奏
+                await asyncio.wait_for_ms(led_event.wait(), time.ticks_diff(blink_next_ms, now))
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await led_event.wait()
 
 # =================================================================
 # --- I2C 與 邏輯 (I2C & Logic) ---
 # =================================================================
 
 async def i2c_loop():
-    global is_uno_online, last_rfid_from_uno, current_temperature, current_humidity, light_level
+    global is_uno_online, last_rfid_from_uno, current_temperature, current_humidity, light_level, sensor_json_cache
     
     print("Starting I2C Loop...")
     
@@ -149,68 +189,63 @@ async def i2c_loop():
         await asyncio.sleep_ms(I2C_CHECK_INTERVAL_MS)
         
         try:
-            # Request 10 bytes
-            data = i2c.readfrom(UNO_I2C_ADDRESS, 10)
+            # Request 10 bytes into the preallocated buffer (fills all of it or raises OSError)
+            i2c.readfrom_into(UNO_I2C_ADDRESS, I2C_BUF)
+            data = I2C_BUF
             
-            if len(data) == 10:
-                if not is_uno_online:
-                    print("I2C: Online.")
-                    is_uno_online = True
+            if not is_uno_online:
+                print("I2C: Online.")
+                is_uno_online = True
+                sensor_json_cache = None
+            
+            status_flag = data[0]
+            
+            if status_flag == 0x01:
+                # RFID
+                uid_raw = I2C_MV[1:5]
+                # Convert to Hex String (single C call)
+                uid_str = ubinascii.hexlify(uid_raw).decode().upper()
+                last_rfid_from_uno = uid_str
+                sensor_json_cache = None
+                print(f">>> Received RFID: {last_rfid_from_uno}")
                 
-                status_flag = data[0]
+            elif status_flag == 0x02:
+                # Environment
+                # packetBuffer[1]<<8 | packetBuffer[2] -> temp * 10
+                t_raw = (data[1] << 8) | data[2]
+                # Python treats bytes as unsigned, so this is simple.
+                # Handle negative? C++ uses ((packetBuffer[1] << 8) | packetBuffer[2]) / 10.0
+                # If it's a signed 16-bit int, we might need correction, but let's assume valid range.
+                if t_raw > 32767: t_raw -= 65536 # Basic signed conversion if needed
+                current_temperature = t_raw / 10.0
                 
-                if status_flag == 0x01:
-                    # RFID
-                    uid_raw = data[1:5]
-                    # Convert to Hex String
-                    uid_str = "".join(["{:02X}".format(b) for b in uid_raw])
-                    last_rfid_from_uno = uid_str
-                    print(f">>> Received RFID: {last_rfid_from_uno}")
-                    
-                elif status_flag == 0x02:
-                    # Environment
-                    # packetBuffer[1]<<8 | packetBuffer[2] -> temp * 10
-                    t_raw = (data[1] << 8) | data[2]
-                    # Python treats bytes as unsigned, so this is simple.
-                    # Handle negative? C++ uses ((packetBuffer[1] << 8) | packetBuffer[2]) / 10.0
-                    # If it's a signed 16-bit int, we might need correction, but let's assume valid range.
-                    if t_raw > 32767: t_raw -= 65536 # Basic signed conversion if needed
-                    current_temperature = t_raw / 10.0
-                    
-                    current_humidity = float(data[3])
-                    light_level = (data[4] << 8) | data[5]
-                    
-                    print(f">>> Received ENV: Temp: {current_temperature}, Humid: {current_humidity}, Light: {light_level}")
-
-                # Blink Blue briefly on success
-                # Since we don't want to block, we just set it and let a background tiny task turn it off?
-                # Or just ignore slight blocking for 10ms. C++ did delay(10).
-                led_b.value(0) # ON
-                await asyncio.sleep_ms(10)
-                led_b.value(1) # OFF
+                current_humidity = float(data[3])
+                light_level = (data[4] << 8) | data[5]
+                sensor_json_cache = None
                 
-            else:
-                # Should not happen with readfrom if it returns
-                pass
+                print(f">>> Received ENV: Temp: {current_temperature}, Humid: {current_humidity}, Light: {light_level}")
+
+            # Blink Blue briefly on success (turned off by led_task, no wait here)
+            flash_led(led_b)
                 
         except OSError:
             if is_uno_online:
                 print("I2C: Connection lost")
             is_uno_online = False
             last_rfid_from_uno = "N/A"
+            sensor_json_cache = None
 
 def play_track(track_num):
     if not is_uno_online: return
     try:
         print(f"<<< Send CMD: Play track {track_num}")
         # 'P' is 0x50
-        buf = bytes([0x50, track_num])
-        i2c.writeto(UNO_I2C_ADDRESS, buf)
+        CMD_BUF[0] = 0x50
+        CMD_BUF[1] = track_num
+        i2c.writeto(UNO_I2C_ADDRESS, CMD_BUF)
         
-        # Blink Green
-        led_g.value(0)
-        time.sleep_ms(10)
-        led_g.value(1)
+        # Blink Green (non-blocking)
+        flash_led(led_g)
     except OSError as e:
         print(f"I2C Write Error: {e}")
 
@@ -218,13 +253,11 @@ def chg_vol(vol_char):
     if not is_uno_online: return
     try:
         print(f"<<< Send CMD: Volume {vol_char}")
-        buf = bytes([ord(vol_char)]) # '+' or '-'
-        i2c.writeto(UNO_I2C_ADDRESS, buf)
+        CMD_BUF[0] = ord(vol_char) # '+' or '-'
+        i2c.writeto(UNO_I2C_ADDRESS, CMD_MV[:1])
         
-        # Blink Green
-        led_g.value(0)
-        time.sleep_ms(10)
-        led_g.value(1)
+        # Blink Green (non-blocking)
+        flash_led(led_g)
     except OSError as e:
         print(f"I2C Write Error: {e}")
 
@@ -232,35 +265,48 @@ def chg_vol(vol_char):
 # --- Web Server (Minimal Async) ---
 # =================================================================
 
-def get_nav_footer():
-    return """<hr style='margin-top: 50px;'>
+CT_HTML = "text/html; charset=UTF-8"
+CT_JSON = "application/json"
+CT_TEXT = "text/plain"
+
+def build_response_header(status_code, content_type):
+    return ("HTTP/1.1 %d OK\r\nContent-Type: %s\r\nAccess-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n"
+            % (status_code, content_type)).encode()
+
+# 所有用得到的 (狀態碼, Content-Type) 回應標頭，預先編碼成 bytes
+RESPONSE_HEADERS = {
+    key: build_response_header(*key)
+    for key in ((200, CT_HTML), (200, CT_JSON), (200, CT_TEXT), (400, CT_TEXT), (404, CT_TEXT))
+}
+
+# 靜態 HTML 在載入模組時就組好並編碼成 bytes 片段，請求時逐段寫出，不再重組/編碼
+# (頁尾只存一份，各頁共用)
+NAV_FOOTER = """<hr style='margin-top: 50px;'>
 <p>
 <a href='/'>[首頁]</a> | 
 <a href='/debug'>[測試頁面]</a> | 
 <a href='/sensor'>[即時數據]</a> | 
 <a href='/update'>[Update(Dummy)]</a>
-</p>"""
-
-async def handle_root(writer):
-    ip = wlan.ifconfig()[0]
-    mac = "".join(["{:02X}:".format(b) for b in wlan.config('mac')])[:-1]
-    uno_status = "<span style='color: green;'>Online</span>" if is_uno_online else "<span style='color: red;'>Offline</span>"
-    
-    html = f"""<h1>MotoNodeMCU Control Panel (MicroPython)</h1>
-<p>Access me at <a href='http://{MDNS_HOSTNAME}.local'>http://{MDNS_HOSTNAME}.local</a></p>
-<h3>STA IP: {ip}</h3>
-<h3>STA MAC: {mac}</h3>
-<h3>UNO Module: {uno_status}</h3>
-<h3>Last RFID Scanned: {last_rfid_from_uno}</h3>
-<h3>Device Temp: {current_temperature:.1f} &deg;C</h3>
-<h3>Device Humidity: {current_humidity:.1f} &#x25;</h3>
-<h3>Device Light: {light_level}</h3>
-{get_nav_footer()}"""
-    
-    await send_response(writer, 200, "text/html; charset=UTF-8", html)
-
-async def handle_debug(writer):
-    html = f"""<h1>Debug & Test Page</h1>
+</p>""".encode()
+
+# 首頁: 靜態片段之間穿插少數動態欄位 (IP, MAC, UNO, RFID, 溫度, 濕度, 日照)
+ROOT_PARTS = (
+    ("""<h1>MotoNodeMCU Control Panel (MicroPython)</h1>
+<p>Access me at <a href='http://""" + MDNS_HOSTNAME + """.local'>http://""" + MDNS_HOSTNAME + """.local</a></p>
+<h3>STA IP: """).encode(),
+    b"</h3>\n<h3>STA MAC: ",
+    b"</h3>\n<h3>UNO Module: ",
+    b"</h3>\n<h3>Last RFID Scanned: ",
+    b"</h3>\n<h3>Device Temp: ",
+    b" &deg;C</h3>\n<h3>Device Humidity: ",
+    b" &#x25;</h3>\n<h3>Device Light: ",
+    b"</h3>\n",
+)
+UNO_ONLINE_HTML = b"<span style='color: green;'>Online</span>"
+UNO_OFFLINE_HTML = b"<span style='color: red;'>Offline</span>"
+
+# 完全靜態的頁面: 標頭 + 內容 + 頁尾在載入時就串成一整塊 bytes，請求時只需一次 write
+DEBUG_RESPONSE = RESPONSE_HEADERS[(200, CT_HTML)] + """<h1>Debug & Test Page</h1>
 <h3>DFPlayer Control</h3>
 播放第 <input type='number' id='trackNum' value='1' min='1' style='width: 50px;'> 首: 
 <button onclick="playSpecificTrack()">Play</button><br>
@@ -277,17 +323,15 @@ async def handle_debug(writer):
 <h3>System</h3>
 <button onclick="if(confirm('你確定嗎？')) sendCmd('restart')">Restart Device</button>
 <script>
-function sendCmd(cmd) {{ fetch('/api/' + cmd).then(response => console.log(cmd + ' sent.')); }}
-function playSpecificTrack() {{
+function sendCmd(cmd) { fetch('/api/' + cmd).then(response => console.log(cmd + ' sent.')); }
+function playSpecificTrack() {
   var trackId = document.getElementById('trackNum').value;
-  if (trackId) {{ fetch('/api/play?track=' + trackId).then(response => console.log('Play track ' + trackId + ' command sent.')); }}
-}}
+  if (trackId) { fetch('/api/play?track=' + trackId).then(response => console.log('Play track ' + trackId + ' command sent.')); }
+}
 </script>
-{get_nav_footer()}"""
-    await send_response(writer, 200, "text/html; charset=UTF-8", html)
+""".encode() + NAV_FOOTER
 
-async def handle_sensor_page(writer):
-    html = f"""<h1>傳感器即時數據</h1>
+SENSOR_RESPONSE = RESPONSE_HEADERS[(200, CT_HTML)] + """<h1>傳感器即時數據</h1>
 <p>更新週期: 2.5秒</p>
 <h2 style='font-size: 2em;'>UNO: <span id='UNO' style='color: #4b4b4b;'>--</span></h2>
 <h2 style='font-size: 2em;'>溫度: <span id='temp' style='color: #E67E22;'>--</span> &deg;C</h2>
@@ -295,48 +339,138 @@ async def handle_sensor_page(writer):
 <h2 style='font-size: 2em;'>日照: <span id='light' style='color: #F1C40F;'>--</span></h2>
 <h2 style='font-size: 2em;'>卡號: <span id='card' style='color: #7F4448;'>--</span></h2>
 <script>
-function updateSensorData() {{
+function updateSensorData() {
   fetch('/api/sensors').then(response => response.json())
-    .then(data => {{
+    .then(data => {
       document.getElementById('UNO').innerText = data.UNO;
       document.getElementById('UNO').style.color = (data.UNO == 'Online') ? '#2ECC71' : '#E74C3C';
       document.getElementById('temp').innerText = data.temperature.toFixed(1);
       document.getElementById('humid').innerText = data.humidity.toFixed(1);
       document.getElementById('light').innerText = data.light;
       document.getElementById('card').innerText = data.card;
-    }}).catch(error => console.error('Error fetching sensor data:', error));
-}}
-window.onload = function() {{ updateSensorData(); setInterval(updateSensorData, 2500); }};
+    }).catch(error => console.error('Error fetching sensor data:', error));
+}
+window.onload = function() { updateSensorData(); setInterval(updateSensorData, 2500); };
 </script>
-{get_nav_footer()}"""
-    await send_response(writer, 200, "text/html; charset=UTF-8", html)
-
-async def handle_api_sensors(writer):
-    data = {
-        "temperature": current_temperature,
-        "humidity": current_humidity,
-        "light": light_level,
-        "card": last_rfid_from_uno,
-        "UNO": "Online" if is_uno_online else "Offline"
-    }
-    await send_response(writer, 200, "application/json", ujson.dumps(data))
+""".encode() + NAV_FOOTER
+
+async def handle_root(writer, query_params):
+    ip = wlan.ifconfig()[0]
+    mac = ubinascii.hexlify(wlan.config('mac'), ':').decode().upper()
+    uno_status = UNO_ONLINE_HTML if is_uno_online else UNO_OFFLINE_HTML
+    
+    p = ROOT_PARTS
+    await send_response(writer, 200, CT_HTML, (
+        p[0], ip.encode(), p[1], mac.encode(), p[2], uno_status, p[3], last_rfid_from_uno.encode(),
+        p[4], ("%.1f" % current_temperature).encode(), p[5], ("%.1f" % current_humidity).encode(),
+        p[6], str(light_level).encode(), p[7], NAV_FOOTER))
+
+async def handle_debug(writer, query_params):
+    await send_static(writer, DEBUG_RESPONSE)
+
+async def handle_sensor_page(writer, query_params):
+    await send_static(writer, SENSOR_RESPONSE)
+
+SENSOR_JSON_FORMAT = '{"temperature":%.1f,"humidity":%.1f,"light":%d,"card":"%s","UNO":"%s"}'
+
+async def handle_api_sensors(writer, query_params):
+    global sensor_json_cache
+    if sensor_json_cache is None:
+        # 欄位固定，直接格式化成 JSON，不經過 dict + ujson.dumps
+        # (card 只會是 HEX 卡號或 "N/A"，不需要跳脫)
+        sensor_json_cache = (SENSOR_JSON_FORMAT % (
+            current_temperature, current_humidity, light_level, last_rfid_from_uno,
+            "Online" if is_uno_online else "Offline")).encode()
+    await send_response(writer, 200, CT_JSON, sensor_json_cache)
 
 async def handle_api_play(writer, query_params):
-    track_id = query_params.get('track', None)
+    track_id = query_params.get(b'track', None)
     if track_id:
         try:
-            tid = int(track_id)
+            tid = int(track_id.decode())
             play_track(tid)
-            await send_response(writer, 200, "text/plain", f"Play command for track {tid} sent.")
+            await send_response(writer, 200, CT_TEXT, f"Play command for track {tid} sent.")
         except ValueError:
-            await send_response(writer, 400, "text/plain", "Invalid track number")
+            await send_response(writer, 400, CT_TEXT, "Invalid track number")
     else:
-        await send_response(writer, 400, "text/plain", "Missing track parameter")
+        await send_response(writer, 400, CT_TEXT, "Missing track parameter")
+
+async def handle_vol_up(writer, query_params):
+    chg_vol('+')
+    await send_response(writer, 200, CT_TEXT, b"OK")
+
+async def handle_vol_down(writer, query_params):
+    chg_vol('-')
+    await send_response(writer, 200, CT_TEXT, b"OK")
+
+async def handle_blink_g(writer, query_params):
+    start_blinking('G', 250)
+    await send_response(writer, 200, CT_TEXT, b"OK")
+
+async def handle_blink_b(writer, query_params):
+    start_blinking('B', 250)
+    await send_response(writer, 200, CT_TEXT, b"OK")
+
+async def handle_on_g(writer, query_params):
+    set_led('G', True)
+    await send_response(writer, 200, CT_TEXT, b"OK")
+
+async def handle_on_b(writer, query_params):
+    set_led('B', True)
+    await send_response(writer, 200, CT_TEXT, b"OK")
+
+async def handle_off_g(writer, query_params):
+    set_led('G', False)
+    await send_response(writer, 200, CT_TEXT, b"OK")
+
+async def handle_off_b(writer, query_params):
+    set_led('B', False)
+    await send_response(writer, 200, CT_TEXT, b"OK")
+
+async def handle_stop_blink(writer, query_params):
+    set_solid_led_color(False, False)
+    await send_response(writer, 200, CT_TEXT, b"OK")
+
+async def handle_restart(writer, query_params):
+    await send_response(writer, 200, CT_TEXT, b"Restarting...")
+    await asyncio.sleep(0.5)
+    machine.reset()
+
+# 路徑 (bytes) -> handler(writer, query_params)
+# 刻意維持單層 dict: 一次雜湊查表即可找到任何路徑；
+# 若先比對 b"/api/" 前綴再查子表，反而多一次切片配置與比較
+ROUTES = {
+    b"/": handle_root,
+    b"/debug": handle_debug,
+    b"/sensor": handle_sensor_page,
+    b"/api/sensors": handle_api_sensors,
+    b"/api/play": handle_api_play,
+    b"/api/vol_up": handle_vol_up,
+    b"/api/vol_down": handle_vol_down,
+    b"/api/blink_g": handle_blink_g,
+    b"/api/blink_b": handle_blink_b,
+    b"/api/on_g": handle_on_g,
+    b"/api/on_b": handle_on_b,
+    b"/api/off_g": handle_off_g,
+    b"/api/off_b": handle_off_b,
+    b"/api/stop_blink": handle_stop_blink,
+    b"/api/restart": handle_restart,
+}
 
 async def send_response(writer, status_code, content_type, content):
-    response_header = f"HTTP/1.1 {status_code} OK\r\nContent-Type: {content_type}\r\nAccess-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n"
-    writer.write(response_header.encode())
-    writer.write(content.encode())
+    writer.write(RESPONSE_HEADERS[(status_code, content_type)])
+    # tuple: 依序寫出的 bytes 片段 (首頁)；bytes: 直接送出；str: 編碼後送出
+    if isinstance(content, tuple):
+        for chunk in content:
+            writer.write(chunk)
+    else:
+        writer.write(content if isinstance(content, bytes) else content.encode())
+    await writer.drain()
+    writer.close()
+
+async def send_static(writer, response):
+    """送出預先組好的完整回應 (含標頭)"""
+    writer.write(response)
     await writer.drain()
     writer.close()
 
@@ -347,64 +481,32 @@ async def web_server_handler(reader, writer):
             writer.close()
             return
         
-        request_str = request_line.decode().strip()
-        method, path, _ = request_str.split()
+        # "GET /path?query HTTP/1.1" 直接在 bytes 上切割，不先 decode/split 成字串
+        line = request_line.rstrip()
+        i1 = line.index(b' ')
+        i2 = line.index(b' ', i1 + 1)
+        method = line[:i1]
+        path = line[i1 + 1:i2]
         
-        # Parse Query Params
+        # Parse Query Params (keys/values stay bytes)
         query_params = {}
-        if '?' in path:
-            path, query = path.split('?', 1)
-            for pair in query.split('&'):
-                if '=' in pair:
-                    k, v = pair.split('=', 1)
+        q = path.find(b'?')
+        if q >= 0:
+            query = path[q + 1:]
+            path = path[:q]
+            for pair in query.split(b'&'):
+                if b'=' in pair:
+                    k, v = pair.split(b'=', 1)
                     query_params[k] = v
         
-        print(f"WEB: {method} {path}")
+        print("WEB:", method.decode(), path.decode())
         
-        # Simple Routing
-        if path == "/":
-            await handle_root(writer)
-        elif path == "/debug":
-            await handle_debug(writer)
-        elif path == "/sensor":
-            await handle_sensor_page(writer)
-        elif path == "/api/sensors":
-            await handle_api_sensors(writer)
-        elif path == "/api/play":
-            await handle_api_play(writer, query_params)
-        elif path == "/api/vol_up":
-            chg_vol('+')
-            await send_response(writer, 200, "text/plain", "OK")
-        elif path == "/api/vol_down":
-            chg_vol('-')
-            await send_response(writer, 200, "text/plain", "OK")
-        elif path == "/api/blink_g":
-            start_blinking('G', 250)
-            await send_response(writer, 200, "text/plain", "OK")
-        elif path == "/api/blink_b":
-            start_blinking('B', 250)
-            await send_response(writer, 200, "text/plain", "OK")
-        elif path == "/api/on_g":
-            set_led('G', True)
-            await send_response(writer, 200, "text/plain", "OK")
-        elif path == "/api/on_b":
-            set_led('B', True)
-            await send_response(writer, 200, "text/plain", "OK")
-        elif path == "/api/off_g":
-            set_led('G', False)
-            await send_response(writer, 200, "text/plain", "OK")
-        elif path == "/api/off_b":
-            set_led('B', False)
-            await send_response(writer, 200, "text/plain", "OK")
-        elif path == "/api/stop_blink":
-            set_solid_led_color(False, False)
-            await send_response(writer, 200, "text/plain", "OK")
-        elif path == "/api/restart":
-            await send_response(writer, 200, "text/plain", "Restarting...")
-            await asyncio.sleep(0.5)
-            machine.reset()
+        # Routing: one dict lookup instead of walking an elif chain
+        handler = ROUTES.get(path)
+        if handler is None:
+            await send_response(writer, 404, CT_TEXT, b"Not Found")
         else:
-            await send_response(writer, 404, "text/plain", "Not Found")
+            await handler(writer, query_params)
             
     except Exception as e:
         print(f"WEB Error: {e}")
@@ -416,6 +518,7 @@ async def web_server_handler(reader, writer):
 
 async def main():
     setup_hardware()
+    asyncio.create_task(led_task())
     
     print("--- MotoNodeMCU MicroPython Booting ---")
     
@@ -423,13 +526,11 @@ async def main():
     wlan.connect(STA_SSID, STA_PASSWORD)
     
     t_start = time.ticks_ms()
-    led_state = True
     
     # Blinking while connecting
     print("Connecting to WiFi...")
+    start_blinking('G', 300)
     while not wlan.isconnected():
-        led_g.value(0 if led_state else 1)
-        led_state = not led_state
         await asyncio.sleep_ms(300)
         if time.ticks_diff(time.ticks_ms(), t_start) > WIFI_TIMEOUT_MS:
             print("WiFi Connect Timeout")
@@ -448,9 +549,17 @@ async def main():
     print("Starting Web Server...")
     await asyncio.start_server(web_server_handler, "0.0.0.0", 80)
     
+    # 開機配置完成後設定自動 GC 門檻: 配置量累積到剩餘 heap 的 1/4 時由配置器觸發收集
+    gc.collect()
+    gc.threshold(gc.mem_free() // 4 + gc.mem_alloc())
+    print("GC threshold set, free:", gc.mem_free())
+    
+    # 不再每秒固定 gc.collect() (每次會停頓數 ms)，只在記憶體吃緊時補收一次
     while True:
-        await asyncio.sleep(1)
-        gc.collect()
+        await asyncio.sleep(GC_CHECK_INTERVAL_S)
+        if gc.mem_free() < GC_LOW_MEM_BYTES:
+            gc.collect()
+            print("GC: low memory, free after collect:", gc.mem_free())
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,16 @@
+# Copyright (C) 2026 eddie772tw
+# This file is part of motoPlayer.
+# motoPlayer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# 裝置上的 main.py 入口 (由 flash_and_test.py 上傳)：
+# 實際程式是以 mpy-cross 預先編譯的 moto_main.mpy，開機時不需再解析/編譯原始碼。
+import moto_main
+import uasyncio as asyncio
+
+try:
+    asyncio.run(moto_main.main())
+except KeyboardInterrupt:
+    pass
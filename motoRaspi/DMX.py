@@ -13,6 +13,43 @@ from bleak import BleakClient, BleakError
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s][%(asctime)s]%(message)s')
 
+# response=False 的寫入只等封包交給 BlueZ 就返回，允許同時進行的寫入數上限
+MAX_INFLIGHT_WRITES = 4
+
+# 亮度 0-100 對應指令中的 0-32 刻度，載入時先算好
+_BRI_SCALED = bytes((i * 32) // 100 for i in range(101))
+
+# 電源指令只有兩種，直接使用不可變的常數
+_POWER_ON = bytes([123, 255, 4, 1, 255, 255, 255, 255, 191])
+_POWER_OFF = bytes([123, 255, 4, 0, 255, 255, 255, 255, 191])
+
+# batch() 是否將多筆指令串接成同一筆寫入；控制器能否解析尚未在實機上驗證，
+# 預設關閉 (逐筆寫入，仍只更新一次狀態快取)
+FUSE_BATCH_WRITES = False
+
+# 串接寫入的單筆上限: 預設 ATT MTU (23) 扣除 3 bytes 標頭，可容納 2 筆 9 bytes 指令
+# (不讀取 client.mtu_size: BlueZ 上未協商 MTU 時每次讀取都會發出警告)
+MAX_WRITE_PAYLOAD = 20
+
+# 狀態指令碼 -> 會被它覆蓋的指令碼 (7: 靜態顏色, 3: 動態模式)
+_OVERRIDES = {7: 3, 3: 7}
+
+# 會被狀態快取略過的設定函式 -> 組成其指令的函式 (電源不在其中，一律送出)
+_STATE_BUILDERS = {
+    "set_static_color": "_color_command",
+    "set_brightness": "_brightness_command",
+    "set_mode": "_mode_command",
+    "set_speed": "_speed_command",
+}
+
+def install_uvloop():
+    """若有安裝 uvloop 則改用它作為事件迴圈，否則沿用 asyncio 預設 (需在建立事件迴圈前呼叫)。"""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 class DMXController:
     """
     一個非同步的 DMX BLE 控制器類別，封裝了所有通訊協議。
@@ -20,28 +57,49 @@ class DMXController:
     def __init__(self, device_address: str):
         self._device_address = device_address
         self._characteristic_uuid = "0000ffe1-0000-1000-8000-00805f9b34fb"
-        self._client = BleakClient(self._device_address, timeout=10.0)
-        self._lock = asyncio.Lock()
+        # 連線狀態快取: 由 connect() 與 bleak 的斷線回呼維護，熱路徑上不必詢問後端 (BlueZ 可能是一次 D-Bus 呼叫)
+        self._connected = False
+        # 各類狀態指令上次成功送出的內容 {指令碼: bytes}，相同的值不再重送
+        self._shadow = {}
+        self._client = BleakClient(self._device_address, disconnected_callback=self._on_disconnected, timeout=10.0)
+        # 寫入可重疊進行 (上限 MAX_INFLIGHT_WRITES)；連線/重新連線則只允許一個
+        self._write_sem = asyncio.Semaphore(MAX_INFLIGHT_WRITES)
+        self._reconnect_lock = asyncio.Lock()
+        # 各指令的 9 bytes 範本，固定位元組預先填好，送出時只改寫變動的欄位
+        self._tmpl_color = bytearray(b'\x7b\xff\x07\x00\x00\x00\x00\xff\xbf')
+        self._tmpl_bri = bytearray(b'\x7b\xff\x01\x00\x00\x01\xff\xff\xbf')
+        self._tmpl_mode = bytearray(b'\x7b\xff\x03\x00\xff\xff\xff\xff\xbf')
+        self._tmpl_speed = bytearray(b'\x7b\xff\x02\x00\xff\x01\xff\xff\xbf')
 
     @property
     def is_connected(self) -> bool:
-        return self._client.is_connected
+        return self._connected
+
+    def _on_disconnected(self, client):
+        logger.info(f"{self._device_address} 已斷線")
+        self._connected = False
+        self._shadow.clear()
 
     async def connect(self):
-        """明確地連接到設備。"""
-        if not self.is_connected:
-            logger.info(f"正在連接到 DMX 控制器: {self._device_address}")
-            await self._client.connect()
+        """明確地連接到設備 (同時多個呼叫時只會連線一次，其餘等待結果)。"""
+        async with self._reconnect_lock:
+            if not self.is_connected:
+                logger.info(f"正在連接到 DMX 控制器: {self._device_address}")
+                await self._client.connect()
+                self._connected = True
+                self._shadow.clear() # 設備狀態未知 (可能重開機或被遙控器改過)，全部重新送出
 
     async def disconnect(self):
         """明確地中斷與設備的連接。"""
         if self.is_connected:
             logger.info("正在中斷與 DMX 控制器的連接...")
             await self._client.disconnect()
+            self._connected = False
+            self._shadow.clear()
 
-    async def _send_command(self, command: bytearray):
-        """一個統一的、帶有鎖和自動重連機制的指令發送函式。"""
-        async with self._lock:
+    async def _send_command(self, command: bytes):
+        """一個統一的、帶有並行上限和自動重連機制的指令發送函式。"""
+        async with self._write_sem:
             try:
                 if not self.is_connected:
                     await self.connect()
@@ -50,38 +108,162 @@ class DMXController:
                 await self._client.write_gatt_char(self._characteristic_uuid, command, response=False)
             except BleakError as e:
                 logger.error(f"藍牙錯誤: {e}")
+                # 寫入失敗時以後端狀態校正快取，下一次發送才會觸發重連
+                self._connected = self._client.is_connected
                 raise
             except Exception as e:
                 logger.error(f"發送指令時發生未知錯誤: {e}")
                 raise
 
+    async def _send_state(self, command: bytes, force: bool):
+        """送出狀態類指令；與上次成功送出的同類指令 (command[2]) 相同時略過，force=True 則照送。"""
+        kind = command[2]
+        if not force and self._shadow.get(kind) == command:
+            return
+        await self._send_command(command)
+        self._shadow[kind] = command
+        # 靜態顏色與動態模式互相覆蓋: 切換其中一個後，另一個的舊值不再代表設備狀態
+        self._shadow.pop(_OVERRIDES.get(kind), None)
+
+    async def _send_batch(self, commands):
+        """
+        依序送出一批指令，全部送出後才更新狀態快取。預設每筆指令各自寫入；
+        FUSE_BATCH_WRITES 為 True 時串接成盡量少的 ATT Write (假設控制器以 123 ... 191 為邊界逐筆解析，
+        尚未在實機上驗證)，串接後超過 MAX_WRITE_PAYLOAD 的部分另起一筆。
+        """
+        if not commands:
+            return
+        if not FUSE_BATCH_WRITES:
+            for command in commands:
+                await self._send_command(command)
+            self._update_shadow(commands)
+            return
+        payload = bytearray()
+        for command in commands:
+            if payload and len(payload) + len(command) > MAX_WRITE_PAYLOAD:
+                await self._send_command(bytes(payload))
+                payload.clear()
+            payload += command
+        await self._send_command(bytes(payload))
+        self._update_shadow(commands)
+
+    def _update_shadow(self, commands):
+        """依送出順序套用一批指令到狀態快取 (開關電源會清除之前的狀態)。"""
+        for command in commands:
+            if command in (_POWER_ON, _POWER_OFF):
+                self._shadow.clear()
+            else:
+                kind = command[2]
+                self._shadow[kind] = command
+                self._shadow.pop(_OVERRIDES.get(kind), None)
+
+    def is_current(self, method: str, *args) -> bool:
+        """method(*args) 送出的內容是否與設備目前狀態 (上次成功送出的同類指令) 相同，相同則呼叫也會被略過。"""
+        build = _STATE_BUILDERS.get(method)
+        if build is None:
+            return False
+        command = getattr(self, build)(*args)
+        return self._shadow.get(command[2]) == command
+
+    def batch(self) -> "DMXBatch":
+        """
+        收集多個設定，離開 `async with` 時一起送出 (DMX_daemon 以此送出一次的多個指令)；
+        FUSE_BATCH_WRITES 開啟時合併成盡量少的寫入:
+            async with controller.batch() as b:
+                await b.set_brightness(50)
+                await b.set_speed(80)
+        """
+        return DMXBatch(self)
+
+    # --- 指令組成 (回傳範本的複本: 等待寫入名額期間範本可能已被下一次呼叫改寫) ---
+
+    def _color_command(self, r: int, g: int, b: int, a: int = 255) -> bytes:
+        t = self._tmpl_color
+        t[3] = r
+        t[4] = g
+        t[5] = b
+        t[6] = a
+        return bytes(t)
+
+    def _brightness_command(self, brightness: int) -> bytes:
+        # 一般情況 (0-100) 只需一次比較，超出範圍才夾限
+        bri = brightness if 0 <= brightness <= 100 else max(0, min(100, brightness))
+        t = self._tmpl_bri
+        t[3] = _BRI_SCALED[bri]
+        t[4] = bri
+        return bytes(t)
+
+    def _mode_command(self, mode: int) -> bytes:
+        t = self._tmpl_mode
+        t[3] = mode & 0xFF
+        return bytes(t)
+
+    def _speed_command(self, speed: int) -> bytes:
+        t = self._tmpl_speed
+        t[3] = speed if 0 <= speed <= 100 else max(0, min(100, speed))
+        return bytes(t)
+
     # --- 功能性 API ---
 
-    async def set_static_color(self, r: int, g: int, b: int, a: int = 255):
+    async def set_static_color(self, r: int, g: int, b: int, a: int = 255, force: bool = False):
         """設定靜態顏色"""
-        command = bytearray([123, 255, 7, r, g, b, a, 255, 191])
-        await self._send_command(command)
+        await self._send_state(self._color_command(r, g, b, a), force)
 
     async def set_power(self, is_on: bool):
         """設定電源開關"""
-        cmd = 1 if is_on else 0
-        command = bytearray([123, 255, 4, cmd, 255, 255, 255, 255, 191])
-        await self._send_command(command)
+        # 開關電源後設備可能回到預設狀態，之後的顏色/亮度等一律重新送出
+        self._shadow.clear()
+        await self._send_command(_POWER_ON if is_on else _POWER_OFF)
 
-    async def set_brightness(self, brightness: int):
+    async def set_brightness(self, brightness: int, force: bool = False):
         """設定亮度 (0-100)"""
-        bri = max(0, min(100, brightness))
-        bri_scaled = (bri * 32) // 100
-        command = bytearray([123, 255, 1, bri_scaled, bri, 1, 255, 255, 191])
-        await self._send_command(command)
+        await self._send_state(self._brightness_command(brightness), force)
     
-    async def set_mode(self, mode: int):
+    async def set_mode(self, mode: int, force: bool = False):
         """設定動態模式 (1-255)"""
-        command = bytearray([123, 255, 3, mode, 255, 255, 255, 255, 191])
-        await self._send_command(command)
+        await self._send_state(self._mode_command(mode), force)
         
-    async def set_speed(self, speed: int):
+    async def set_speed(self, speed: int, force: bool = False):
         """設定動態模式的速度 (0-100)"""
-        spd = max(0, min(100, speed))
-        command = bytearray([123, 255, 2, spd, 255, 1, 255, 255, 191])
-        await self._send_command(command)
+        await self._send_state(self._speed_command(speed), force)
+
+class DMXBatch:
+    """
+    DMXController.batch() 回傳的批次物件，API 與控制器的設定函式相同。
+    設定只會先記下，離開 `async with` 時才一起送出；區塊內發生例外則全部捨棄。
+    """
+    def __init__(self, controller: DMXController):
+        self._controller = controller
+        self._commands = []
+        self._power_queued = False # 批次中含開關電源時，狀態快取不再代表送出當下的設備狀態
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        commands, self._commands = self._commands, []
+        self._power_queued = False
+        if exc_type is None:
+            await self._controller._send_batch(commands)
+
+    def _add_state(self, command: bytes, force: bool):
+        # 與設備目前狀態相同的值不必送出
+        if not force and not self._power_queued and self._controller._shadow.get(command[2]) == command:
+            return
+        self._commands.append(command)
+
+    async def set_static_color(self, r: int, g: int, b: int, a: int = 255, force: bool = False):
+        self._add_state(self._controller._color_command(r, g, b, a), force)
+
+    async def set_power(self, is_on: bool):
+        self._power_queued = True
+        self._commands.append(_POWER_ON if is_on else _POWER_OFF)
+
+    async def set_brightness(self, brightness: int, force: bool = False):
+        self._add_state(self._controller._brightness_command(brightness), force)
+
+    async def set_mode(self, mode: int, force: bool = False):
+        self._add_state(self._controller._mode_command(mode), force)
+
+    async def set_speed(self, speed: int, force: bool = False):
+        self._add_state(self._controller._speed_command(speed), force)
@@ -1,138 +1,281 @@
+import argparse
 import asyncio
 import logging
-from DMX import DMXController
+import re
+import sys
+import threading
+from DMX import DMXController, install_uvloop
+from DMX_daemon import SOCKET_PATH, COMMANDS, send_commands
 from DMX_test import DEVICE_ADDRESS as DEFAULT_DMX_ADDRESS
+try:
+    # Reads stdin on the event loop itself instead of handing every line to the default thread pool
+    from aioconsole import ainput
+except ImportError:
+    _stdin_lines = None # asyncio.Queue fed by the reader thread; None at EOF
+
+    def _read_stdin(loop, queue):
+        try:
+            for line in sys.stdin:
+                loop.call_soon_threadsafe(queue.put_nowait, line.rstrip("\n"))
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+        except RuntimeError:
+            pass # Event loop already closed
+
+    async def ainput(prompt=""):
+        """Fallback: one long-lived daemon thread reads stdin into a queue,
+        instead of an executor job (to_thread) per prompt."""
+        global _stdin_lines
+        if _stdin_lines is None:
+            _stdin_lines = asyncio.Queue()
+            threading.Thread(target=_read_stdin, args=(asyncio.get_running_loop(), _stdin_lines), daemon=True).start()
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        line = await _stdin_lines.get()
+        if line is None:
+            raise EOFError
+        return line
+
+logger = logging.getLogger(__name__)
+
+# One precompiled pattern per argument count, e.g. 3 -> "(\d{1,3})\s+(\d{1,3})\s+(\d{1,3})"
+# (ASCII only: \d would otherwise also match other Unicode decimal digits)
+_VALUES_RE = {argc: re.compile(r"\s+".join([r"(\d{1,3})"] * argc), re.ASCII)
+              for argc in {entry[2] for entry in COMMANDS.values()}}
+
+_EXIT_WORDS = frozenset(("exit", "quit"))
+
+def _build_command_re():
+    """The whole REPL grammar as one case-insensitive pattern generated from COMMANDS, e.g.
+    \s*(?:(on)|...|(color)\s+(\d{1,3})\s+(\d{1,3})\s+(\d{1,3})|...|(help)|(exit)|(quit))\s*
+    Also returns {m.lastindex: (command, index of its first value group)}: the last group
+    that matched tells which alternative it was, without scanning m.groups()."""
+    alternatives = []
+    by_last_group = {}
+    group = 0
+    for name, argc in [(name, entry[2]) for name, entry in COMMANDS.items()] + [("help", 0), ("exit", 0), ("quit", 0)]:
+        alternatives.append(f"({re.escape(name)})" + r"\s+(\d{1,3})" * argc)
+        by_last_group[group + 1 + argc] = (name, group + 2)
+        group += 1 + argc
+    return re.compile(r"\s*(?:%s)\s*" % "|".join(alternatives), re.IGNORECASE | re.ASCII), by_last_group
+
+_COMMAND_RE, _COMMAND_BY_LAST_GROUP = _build_command_re()
+
+def parse_line(line):
+    """Parse one REPL line in a single regex match: (command, values) with the command
+    lower-cased (help/exit/quit included, with no values), or None if the line does not
+    match the grammar or a value does not fit in a byte (0-255)."""
+    m = _COMMAND_RE.fullmatch(line)
+    if m is None:
+        return None
+    last = m.lastindex
+    command, first = _COMMAND_BY_LAST_GROUP[last]
+    values = tuple(map(int, m.groups()[first - 1:last]))
+    return (command, values) if all(v <= 255 for v in values) else None
+
+_MAC_RE = re.compile(r"(?:[0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}")
+
+def parse_macs(text):
+    """All MAC addresses found in text (any separators), upper-cased and de-duplicated in order;
+    malformed entries are skipped."""
+    return list(dict.fromkeys(_MAC_RE.findall(text.upper())))
+
+def parse_values(argc, text):
+    """Validate and convert the values after a command in one regex match;
+    None if malformed or a value does not fit in a byte (0-255)."""
+    m = _VALUES_RE[argc].fullmatch(text.strip())
+    if m is None:
+        return None
+    values = tuple(map(int, m.groups()))
+    return values if all(v <= 255 for v in values) else None
 
 def print_help():
-    """logger.infos the available commands."""
+    """Prints the available commands (generated from COMMANDS)."""
     print("\nAvailable commands:")
-    print("  on                - Turn the light on")
-    print("  off               - Turn the light off")
-    print("  color <r> <g> <b> - Set static color (e.g., color 255 0 0)")
-    print("  brightness <val>  - Set brightness (0-100)")
-    print("  mode <val>        - Set dynamic mode (1-255)")
-    print("  speed <val>       - Set mode speed (0-100)")
-    print("  help              - Show this help message")
-    print("  exit, quit        - Disconnect and exit the CLI\n")
+    for name, (_, _, _, usage, text) in COMMANDS.items():
+        print(f"  {(name + ' ' + usage).strip():<18}- {text}")
+    print(f"  {'help':<18}- Show this help message")
+    print(f"  {'exit, quit':<18}- Disconnect and exit the CLI\n")
 
-async def main():
-    logging.basicConfig(level=logging.INFO, format='[%(levelname)s][%(asctime)s]%(message)s')
-    logger = logging.getLogger(__name__)
-    """Main function to run the interactive CLI."""
-    mac_addresses_input = input(f"Enter DMX controller MAC addresses (comma-separated, or press Enter to use default: {DEFAULT_DMX_ADDRESS}): ").strip()
-    if not mac_addresses_input:
-        mac_addresses = DEFAULT_DMX_ADDRESS
-    else:
-        mac_addresses = [addr.strip() for addr in mac_addresses_input.split(',')]
+async def broadcast(setters, args):
+    """Call every bound setter with *args concurrently and return how many devices failed.
+    Failures are logged and never stop the other devices; a single device is awaited directly without gather."""
+    if len(setters) == 1:
+        try:
+            await setters[0](*args)
+        except Exception as e:
+            logger.error("%s: %s", setters[0].__self__._device_address, e)
+            return 1
+        return 0
+    results = await asyncio.gather(*(fn(*args) for fn in setters), return_exceptions=True)
+    failed = 0
+    for fn, result in zip(setters, results):
+        if isinstance(result, Exception):
+            logger.error("%s: %s", fn.__self__._device_address, result)
+            failed += 1
+    return failed
 
+async def connect_all(mac_addresses):
+    """Connect to every address concurrently; returns a tuple of the controllers that connected."""
     controllers = [DMXController(addr) for addr in mac_addresses]
+    results = await asyncio.gather(*(c.connect() for c in controllers), return_exceptions=True)
+    connected = []
+    for c, result in zip(controllers, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to connect to %s: %s", c._device_address, result)
+        else:
+            connected.append(c)
+    # Fixed for the whole session, so every command reuses the same tuple
+    return tuple(connected)
 
-    async def connect_controller(controller):
-        """Helper to connect to a single controller and handle errors."""
-        try:
-            # logger.info(f"Connecting to {controller._device_address}...")
-            await controller.connect()
-            # logger.info(f"Connected successfully to {controller._device_address}!")
-            return controller
-        except Exception as e:
-            logger.error(f"Failed to connect to {controller._device_address}: {e}")
-            return None
+async def disconnect_all(controllers):
+    logger.info("Disconnecting all connected devices...")
 
-    # Concurrently connect to all devices
-    connect_tasks = [connect_controller(c) for c in controllers]
-    results = await asyncio.gather(*connect_tasks)
-    connected_controllers = [c for c in results if c is not None]
+    async def disconnect_with_log(controller):
+        if controller.is_connected:
+            logger.info("Disconnecting from %s...", controller._device_address)
+            await controller.disconnect()
+            logger.info("Disconnected from %s.", controller._device_address)
 
-    if not connected_controllers:
-        logger.info("No devices could be connected. Exiting.")
-        return
+    results = await asyncio.gather(*(disconnect_with_log(c) for c in controllers), return_exceptions=True)
+    for c, result in zip(controllers, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to disconnect from %s: %s", c._device_address, result)
 
-    try:
-        print_help()
-        active_addresses = ", ".join([c._device_address for c in connected_controllers])
+async def run_repl(controllers):
+    """Read and run commands for the connected controllers until exit/quit or end of input."""
+    # Bound setter methods per DMXController method name, looked up once for the session
+    ops = {method: tuple(getattr(c, method) for c in controllers)
+           for method, *_ in COMMANDS.values()}
 
-        while True:
+    print_help()
+    active_addresses = ", ".join(c._device_address for c in controllers)
+
+    while True:
+        try:
             try:
-                cmd_input = await asyncio.to_thread(input, f"DMX ({active_addresses})> ")
-                parts = cmd_input.lower().split()
-                if not parts:
+                cmd_input = await ainput(f"DMX ({active_addresses})> ")
+            except EOFError:
+                break # stdin closed (Ctrl-D / end of piped input)
+            parsed = parse_line(cmd_input)
+            if parsed is None:
+                # Slow path, only to tell an unknown command from wrong values
+                command = cmd_input.strip().partition(" ")[0].lower()
+                if not command:
                     continue
-
-                command = parts[0]
-
-                if command in ["exit", "quit"]:
-                    break
-                elif command == "help":
+                entry = COMMANDS.get(command)
+                if entry is None:
+                    logger.error("Unknown command: %s", command)
                     print_help()
-                    continue
-
-                tasks = []
-                if command == "on":
-                    tasks = [c.set_power(True) for c in connected_controllers]
-                    await asyncio.gather(*tasks)
-                    logger.info("Light turned on for all devices.")
-                elif command == "off":
-                    tasks = [c.set_power(False) for c in connected_controllers]
-                    await asyncio.gather(*tasks)
-                    logger.info("Light turned off for all devices.")
-                elif command == "brightness":
-                    if len(parts) == 2 and parts[1].isdigit():
-                        val = int(parts[1])
-                        tasks = [c.set_brightness(val) for c in connected_controllers]
-                        await asyncio.gather(*tasks)
-                        logger.info(f"Brightness set to {val}% for all devices.")
-                    else:
-                        logger.warning("Invalid brightness command. Usage: brightness <value>")
-                elif command == "speed":
-                    if len(parts) == 2 and parts[1].isdigit():
-                        val = int(parts[1])
-                        tasks = [c.set_speed(val) for c in connected_controllers]
-                        await asyncio.gather(*tasks)
-                        logger.info(f"Speed set to {val}% for all devices.")
-                    else:
-                        logger.warning("Invalid speed command. Usage: speed <value>")
-                elif command == "mode":
-                    if len(parts) == 2 and parts[1].isdigit():
-                        val = int(parts[1])
-                        tasks = [c.set_mode(val) for c in connected_controllers]
-                        await asyncio.gather(*tasks)
-                        logger.info(f"Mode set to {val} for all devices.")
-                    else:
-                        logger.warning("Invalid mode command. Usage: mode <value>")
-                elif command == "color":
-                    if len(parts) == 4 and all(p.isdigit() for p in parts[1:]):
-                        r, g, b = map(int, parts[1:])
-                        tasks = [c.set_static_color(r, g, b) for c in connected_controllers]
-                        await asyncio.gather(*tasks)
-                        logger.info(f"Color set to R={r}, G={g}, B={b} for all devices.")
-                    else:
-                        logger.warning("Invalid color command. Usage: color <r> <g> <b>")
                 else:
-                    logger.error(f"Unknown command: {command}")
-                    print_help()
-
-            except (ValueError, IndexError) as e:
-                logger.info(f"Invalid command syntax: {e}")
+                    logger.warning("Invalid %s command. Usage: %s %s", command, command, entry[3])
+                continue
+            command, values = parsed
+            if command in _EXIT_WORDS:
+                break
+            if command == "help":
                 print_help()
-            except Exception as e:
-                logger.info(f"An error occurred: {e}")
+                continue
+            method, fixed_args = COMMANDS[command][:2]
+            args = (*fixed_args, *values)
+            # Devices already in this state would skip the write anyway; don't schedule them at all
+            setters = tuple(fn for fn in ops[method] if not fn.__self__.is_current(method, *args))
+            if not setters:
+                logger.info("%s unchanged on all devices.", cmd_input)
+                continue
+            failed = await broadcast(setters, args)
+            if failed:
+                logger.warning("%s failed on %d of %d devices.", cmd_input, failed, len(setters))
+            else:
+                logger.info("%s sent to all devices.", cmd_input)
+
+        except (ValueError, IndexError) as e:
+            logger.info("Invalid command syntax: %s", e)
+            print_help()
+        except Exception as e:
+            logger.info("An error occurred: %s", e)
+
+async def main():
+    """Main function to run the interactive CLI."""
+    mac_addresses_input = input(f"Enter DMX controller MAC addresses (comma-separated, or press Enter to use default: {DEFAULT_DMX_ADDRESS}): ").strip()
+    if not mac_addresses_input:
+        mac_addresses = DEFAULT_DMX_ADDRESS
+    else:
+        mac_addresses = parse_macs(mac_addresses_input)
+        if not mac_addresses:
+            logger.error("No valid MAC address in: %s", mac_addresses_input)
+            return
 
+    connected_controllers = await connect_all(mac_addresses)
+    if not connected_controllers:
+        logger.info("No devices could be connected. Exiting.")
+        return
+
+    try:
+        await run_repl(connected_controllers)
     except Exception as e:
-        logger.error(f"An error occurred during the process: {e}")
+        logger.error("An error occurred during the process: %s", e)
     finally:
-        if connected_controllers:
-            logger.info("Disconnecting all connected devices...")
+        await disconnect_all(connected_controllers)
+
+def build_plan(tokens):
+    """Parse one-shot command tokens once into [(command, [values]), ...], shared by all devices.
+    e.g. ["on", "color", "255", "0", "0"] -> [("on", []), ("color", [255, 0, 0])]. Raises ValueError."""
+    plan = []
+    i = 0
+    while i < len(tokens):
+        command = tokens[i].lower()
+        entry = COMMANDS.get(command)
+        if entry is None:
+            raise ValueError(f"Unknown command: {command}")
+        argc, usage = entry[2], entry[3]
+        values = tokens[i + 1:i + 1 + argc]
+        parsed = parse_values(argc, " ".join(values)) if len(values) == argc else None
+        if parsed is None:
+            raise ValueError(f"Invalid {command} command. Usage: {command} {usage}".rstrip())
+        plan.append((command, list(parsed)))
+        i += 1 + argc
+    return plan
 
-            async def disconnect_with_log(controller):
-                if controller.is_connected:
-                    logger.info(f"Disconnecting from {controller._device_address}...")
-                    await controller.disconnect()
-                    logger.info(f"Disconnected from {controller._device_address}.")
+async def run_once(mac_addresses, plan):
+    """One-shot mode: hand the plan to DMX_daemon.py, which keeps the devices connected.
+    Devices run in parallel; each one gets the steps in order over a single daemon connection."""
+    results = await asyncio.gather(*(send_commands(mac, plan) for mac in mac_addresses))
+    ok = True
+    for mac, replies in zip(mac_addresses, results):
+        for (command, _), reply in zip(plan, replies):
+            if reply["status"] == "ok":
+                print(f"{mac}: {command} sent.")
+            else:
+                print(f"{mac}: {reply['message']}")
+                ok = False
+    return ok
 
-            tasks = [disconnect_with_log(c) for c in connected_controllers]
-            await asyncio.gather(*tasks)
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="DMX controller CLI. Without commands it runs interactively; "
+                    f"with them they are sent through the DMX daemon ({SOCKET_PATH}) and it exits.")
+    parser.add_argument("commands", nargs="*",
+                        help=f"one-shot commands with their values, e.g. on color 255 0 0 ({', '.join(COMMANDS)})")
+    parser.add_argument("--mac", help="comma-separated MAC addresses (default: DMX_test.DEVICE_ADDRESS)")
+    args = parser.parse_args()
+    try:
+        args.plan = build_plan(args.commands)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s][%(asctime)s]%(message)s')
+    cli_args = parse_args()
+    install_uvloop()
+    if cli_args.plan:
+        macs = parse_macs(cli_args.mac) if cli_args.mac else DEFAULT_DMX_ADDRESS
+        if not macs:
+            raise SystemExit(f"No valid MAC address in: {cli_args.mac}")
+        try:
+            raise SystemExit(0 if asyncio.run(run_once(macs, cli_args.plan)) else 1)
+        except OSError as e:
+            raise SystemExit(f"Could not reach the DMX daemon at {SOCKET_PATH} ({e}). Start it with: python DMX_daemon.py")
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,154 @@
+# Copyright (C) 2026 eddie772tw
+# This file is part of motoPlayer.
+# motoPlayer is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# motoRaspi/DMX_daemon.py
+# Keeps DMXController connections open between DMX_cli.py invocations, so a
+# one-shot command no longer pays BLE connect + service discovery every time.
+import asyncio
+import json
+import logging
+import struct
+import time
+from DMX import DMXController, install_uvloop
+
+logger = logging.getLogger(__name__)
+
+SOCKET_PATH = "/tmp/dmx.sock"
+IDLE_TIMEOUT = 300 # seconds without commands before a controller is disconnected
+REAP_INTERVAL = 60 # seconds between idle checks
+
+# Protocol: every message (both ways) is a 4-byte big-endian length followed by UTF-8 JSON.
+# Request: {"mac": "AA:BB:...", "steps": [["color", [255, 0, 0]], ["on", []], ...]}
+# Reply: a list with one {"status": "ok"} or {"status": "error", "message": ...} per step
+_LENGTH = struct.Struct(">I")
+
+# cmd name -> (DMXController method, fixed leading args, number of int args, usage args, help text)
+# Shared with DMX_cli.py, which builds its dispatch and help text from it
+COMMANDS = {
+    "on": ("set_power", (True,), 0, "", "Turn the light on"),
+    "off": ("set_power", (False,), 0, "", "Turn the light off"),
+    "color": ("set_static_color", (), 3, "<r> <g> <b>", "Set static color (e.g., color 255 0 0)"),
+    "brightness": ("set_brightness", (), 1, "<val>", "Set brightness (0-100)"),
+    "mode": ("set_mode", (), 1, "<val>", "Set dynamic mode (1-255)"),
+    "speed": ("set_speed", (), 1, "<val>", "Set mode speed (0-100)"),
+}
+
+async def read_message(reader):
+    """Read one length-prefixed JSON message; raises asyncio.IncompleteReadError at EOF."""
+    (length,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    return json.loads(await reader.readexactly(length))
+
+def write_message(writer, message):
+    data = json.dumps(message).encode()
+    writer.write(_LENGTH.pack(len(data)) + data)
+
+class DMXDaemon:
+    """Serves {mac, steps} requests on a Unix socket using cached, connected DMXControllers."""
+
+    def __init__(self, socket_path=SOCKET_PATH, idle_timeout=IDLE_TIMEOUT):
+        self._socket_path = socket_path
+        self._idle_timeout = idle_timeout
+        self._controllers: dict[str, DMXController] = {}
+        self._last_used: dict[str, float] = {}
+
+    async def _get_controller(self, mac):
+        controller = self._controllers.get(mac)
+        if controller is None:
+            controller = DMXController(mac)
+            self._controllers[mac] = controller
+        self._last_used[mac] = time.monotonic()
+        # Requests racing on a new MAC share the controller's single in-progress connect
+        await controller.connect()
+        return controller
+
+    @staticmethod
+    def _resolve(cmd, args):
+        """(method, full args, None) for a valid command, (None, None, error reply) otherwise"""
+        entry = COMMANDS.get(cmd)
+        if entry is None:
+            return None, None, {"status": "error", "message": f"Unknown command: {cmd}"}
+        method, fixed_args, argc = entry[:3]
+        if len(args) != argc:
+            return None, None, {"status": "error", "message": f"{cmd} takes {argc} value(s), got {len(args)}"}
+        return method, (*fixed_args, *args), None
+
+    async def _dispatch(self, request):
+        """{mac, steps: [[cmd, args], ...]} -> one reply per step.
+        The valid steps are sent together through controller.batch()."""
+        resolved = [self._resolve(cmd, args) for cmd, args in request["steps"]]
+        replies = [error for _, _, error in resolved]
+        if all(error is not None for error in replies):
+            return replies
+        try:
+            controller = await self._get_controller(request["mac"])
+            async with controller.batch() as b:
+                for method, args, error in resolved:
+                    if error is None:
+                        await getattr(b, method)(*args)
+            ok = {"status": "ok"}
+        except Exception as e:
+            logger.error(f"Plan for {request.get('mac')} failed: {e}")
+            ok = {"status": "error", "message": str(e)}
+        return [ok if reply is None else reply for reply in replies]
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break # Client closed the connection
+                write_message(writer, await self._dispatch(request))
+                await writer.drain()
+        except Exception as e:
+            logger.error(f"Client connection error: {e}")
+        finally:
+            writer.close()
+
+    async def _reap_idle(self):
+        while True:
+            await asyncio.sleep(REAP_INTERVAL)
+            now = time.monotonic()
+            for mac in [m for m, t in self._last_used.items() if now - t > self._idle_timeout]:
+                controller = self._controllers.pop(mac)
+                del self._last_used[mac]
+                logger.info(f"{mac} idle for {self._idle_timeout}s, disconnecting")
+                try:
+                    await controller.disconnect()
+                except Exception as e:
+                    logger.error(f"Failed to disconnect {mac}: {e}")
+
+    async def serve_forever(self):
+        server = await asyncio.start_unix_server(self.handle_client, self._socket_path)
+        reaper = asyncio.create_task(self._reap_idle())
+        logger.info(f"DMX daemon listening on {self._socket_path}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reaper.cancel()
+            await asyncio.gather(*(c.disconnect() for c in self._controllers.values()), return_exceptions=True)
+
+async def send_commands(mac, plan, socket_path=SOCKET_PATH):
+    """Client side: send the plan [(cmd, args), ...] to the daemon as one request and
+    return one reply dict per step. Raises OSError (e.g. FileNotFoundError / ConnectionRefusedError)
+    when the daemon is not running."""
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    try:
+        write_message(writer, {"mac": mac, "steps": [[cmd, list(args)] for cmd, args in plan]})
+        await writer.drain()
+        return await read_message(reader)
+    finally:
+        writer.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s][%(asctime)s]%(message)s')
+    install_uvloop()
+    try:
+        asyncio.run(DMXDaemon().serve_forever())
+    except KeyboardInterrupt:
+        print("\nExiting...")
@@ -4,8 +4,16 @@
 # 用於全面驗證 DMX 控制器的功能。
 
 import asyncio
+import atexit
+import functools
 import logging
-from bleak import BleakClient, BleakError
+import os
+import platform
+import struct
+import threading
+from bleak import BleakClient, BleakError, BleakScanner
+from bleak.backends.characteristic import BleakGATTCharacteristic
+from DMX import MAX_WRITE_PAYLOAD, install_uvloop
 
 # ----------------------------------------------------
 #               參數 (請確認與您的設備相符)
@@ -16,121 +24,360 @@ DEVICE_ADDRESS = [
 ]
 # DEVICE_ADDRESS = "24:07:03:60:E0:68"  # 請替換成您截圖中的真實位址
 CHARACTERISTIC_UUID = "0000ffe1-0000-1000-8000-00805f9b34fb"
+SCAN_TIMEOUT = 5.0 # 所有設備共用一次掃描的最長時間 (秒)
+
+# BlueZ 連線間隔設定 (單位 1.25 ms)，需 root 權限與已掛載的 debugfs
+# 藍牙介面名稱可用環境變數 DMX_HCI_ADAPTER 指定 (例如外接 dongle 為 hci1)
+HCI_ADAPTER = os.environ.get("DMX_HCI_ADAPTER", "hci0")
+HCI_DEBUGFS_ROOT = "/sys/kernel/debug/bluetooth"
+CONN_MIN_INTERVAL = 8   # 10 ms
+CONN_MAX_INTERVAL = 9   # 11.25 ms
 
 # ----------------------------------------------------
 #               私有協議指令產生器 (已擴充)
 # ----------------------------------------------------
+# 指令一律以不可變的 bytes 回傳並快取，重複呼叫時直接重用同一個物件。
+
+# 每筆指令固定 9 個位元組: 123, 255, 指令碼, 參數 x5, 191
+_DMX_FRAME = struct.Struct("9B")
 
-def create_dmx_rgb_command(r: int, g: int, b: int, a: int = 255) -> bytearray:
+_POWER_CMDS = {
+    True: _DMX_FRAME.pack(123, 255, 4, 1, 255, 255, 255, 255, 191),
+    False: _DMX_FRAME.pack(123, 255, 4, 0, 255, 255, 255, 255, 191),
+}
+
+@functools.lru_cache(maxsize=1024) # 有上限: 連續漸變時顏色組合可能多達 1600 萬種
+def create_dmx_rgb_command(r: int, g: int, b: int, a: int = 255) -> bytes:
     """指令碼 7: 設定靜態顏色"""
-    return bytearray([123, 255, 7, r, g, b, a, 255, 191])
+    return _DMX_FRAME.pack(123, 255, 7, r, g, b, a, 255, 191)
 
-def create_dmx_power_command(is_on: bool) -> bytearray:
+def create_dmx_power_command(is_on: bool) -> bytes:
     """指令碼 4: 開/關"""
-    cmd = 1 if is_on else 0
-    return bytearray([123, 255, 4, cmd, 255, 255, 255, 255, 191])
+    return _POWER_CMDS[bool(is_on)]
+
+# 亮度與速度只有 0-100 共 101 種可能，於載入時一次建好查表
+_BRIGHTNESS_TABLE = tuple(
+    _DMX_FRAME.pack(123, 255, 1, (bri * 32) // 100, bri, 1 if bri > 0 else 0, 255, 255, 191)
+    for bri in range(101)
+)
+_SPEED_TABLE = tuple(
+    _DMX_FRAME.pack(123, 255, 2, speed, 255, 1, 255, 255, 191) # direction 暫定為 1
+    for speed in range(101)
+)
 
-def create_dmx_brightness_command(brightness: int) -> bytearray:
+def create_dmx_brightness_command(brightness: int) -> bytes:
     """
     指令碼 1: 設定亮度 (0-100)
     協議文件顯示亮度參數需要兩個值: bri (0-100) 和 bri_scaled ((bri * 32) / 100)
     """
     if not 0 <= brightness <= 100:
         raise ValueError("亮度必須在 0 到 100 之間")
-    bri = brightness
-    bri_scaled = (bri * 32) // 100
-    on_off = 1 if bri > 0 else 0
-    return bytearray([123, 255, 1, bri_scaled, bri, on_off, 255, 255, 191])
+    return _BRIGHTNESS_TABLE[brightness]
 
-def create_dmx_mode_command(mode: int) -> bytearray:
+@functools.lru_cache(maxsize=256)
+def create_dmx_mode_command(mode: int) -> bytes:
     """指令碼 3: 設定動態模式"""
-    return bytearray([123, 255, 3, mode, 255, 255, 255, 255, 191])
+    return _DMX_FRAME.pack(123, 255, 3, mode, 255, 255, 255, 255, 191)
 
-def create_dmx_speed_command(speed: int) -> bytearray:
+def create_dmx_speed_command(speed: int) -> bytes:
     """指令碼 2: 設定模式速度 (0-100)"""
     if not 0 <= speed <= 100:
         raise ValueError("速度必須在 0 到 100 之間")
-    return bytearray([123, 255, 2, speed, 255, 1, 255, 255, 191]) # direction 暫定為 1
+    return _SPEED_TABLE[speed]
+
+def rgb_fade_frames(start, end, n: int) -> bytes:
+    """
+    預先算好從 start 到 end (皆為 (r, g, b)) 的 n 筆顏色指令，串成一段連續的 bytes。
+    第 i 筆為 frames[i * 9:(i + 1) * 9] (可用 memoryview 切片避免複製)。
+    n <= 0 回傳 b""，n == 1 只有 start 一筆。
+    """
+    if n <= 0:
+        return b""
+    if n == 1:
+        return create_dmx_rgb_command(*start)
+    try:
+        # 延遲載入: 只匯入 DEVICE_ADDRESS 的 DMX_cli.py 不必負擔 numpy 的載入時間
+        import numpy as np
+    except ImportError: # 改用純 Python 計算
+        np = None
+    if np is not None:
+        frames = np.empty((n, 9), dtype=np.uint8)
+        frames[:] = (123, 255, 7, 0, 0, 0, 255, 255, 191)
+        for ch in range(3):
+            frames[:, 3 + ch] = np.linspace(start[ch], end[ch], n)
+        return frames.tobytes()
+    last = n - 1
+    return b"".join(
+        _DMX_FRAME.pack(123, 255, 7, *(int(s + (e - s) * i / last) for s, e in zip(start, end)), 255, 255, 191)
+        for i in range(n)
+    )
+
+# --- 測試序列使用的固定指令 (於載入時預先產生) ---
+CMD_COLOR = create_dmx_rgb_command(r=127, g=68, b=72)
+CMD_BRIGHT_LOW = create_dmx_brightness_command(brightness=20)
+CMD_BRIGHT_HIGH = create_dmx_brightness_command(brightness=100)
+CMD_MODE_1 = create_dmx_mode_command(mode=1)
+CMD_SPEED_80 = create_dmx_speed_command(speed=80)
+CMD_POWER_OFF = create_dmx_power_command(is_on=False)
+CMD_MODE_2 = create_dmx_mode_command(mode=2)
+CMD_SPEED_30 = create_dmx_speed_command(speed=30)
+
+# 開場漸變: 0 ~ 0.9 秒由黑色漸變到步驟 1 的顏色，每 0.1 秒一格
+FADE_STEPS = 10
+
+# 測試序列: (距離開始的秒數, 說明, 指令)；開場漸變由 build_test_sequence 加在最前面
+TEST_SEQUENCE = [
+    (1, "1. 發送顏色指令 (#7f4448)", CMD_COLOR),
+    (3, "2. 發送低亮度 (20%) 指令", CMD_BRIGHT_LOW),
+    (5, "3. 發送高亮度 (100%) 指令", CMD_BRIGHT_HIGH),
+    (7, "4. 切換到動態模式 1 (七彩漸變)", CMD_MODE_1),
+    (9, "5. 設定模式速度 (80%)，請觀察燈光動態效果的速度變化", CMD_SPEED_80),
+    (13, "6. 發送關燈指令", CMD_POWER_OFF),
+]
+
+# 控制器能否解析同一筆寫入中的多個指令尚未在實機上驗證，預設每筆指令各自寫入。
+# 設為 True 時在關燈前多一步: 模式 2 與速度 30% 串接成一筆寫入，兩者都生效才代表支援串接
+FUSE_TEST_WRITES = False
+FUSED_CHECK_STEPS = [
+    (13, "6. [串接] 切換到動態模式 2", CMD_MODE_2),
+    (13, "7. [串接] 設定模式速度 (30%)，請確認模式與速度是否都已改變", CMD_SPEED_30),
+    (17, "8. 發送關燈指令", CMD_POWER_OFF),
+]
 
 # ----------------------------------------------------
 
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s][%(asctime)s]%(message)s')
 
-async def test_device(address: str):
+class LazyHex:
+    """延遲到日誌真正輸出時才將指令轉成十六進位字串。"""
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self) -> str:
+        return self.data.hex()
+
+def _batch_sequence(sequence, max_payload: int):
+    """
+    將排在同一時間點的指令串接成單一 payload，一次 ATT Write 送出。
+    假設控制器以 123 ... 191 為每筆指令的邊界連續解析 (尚未實機驗證，只在 FUSE_TEST_WRITES 開啟時使用)；
+    串接後超過 max_payload (MTU - 3) 的部分則另起一筆。
+    """
+    batched = []
+    for delay, label, command in sequence:
+        if batched:
+            last_delay, last_label, last_payload = batched[-1]
+            if last_delay == delay and len(last_payload) + len(command) <= max_payload:
+                batched[-1] = (delay, f"{last_label} + {label}", last_payload + command)
+                continue
+        batched.append((delay, label, command))
+    return batched
+
+def _fade_steps():
+    """開場漸變的步驟，所有畫格由 rgb_fade_frames 一次算好 (執行測試時才計算，匯入本模組不必載入 numpy)。"""
+    frames = rgb_fade_frames((0, 0, 0), (127, 68, 72), FADE_STEPS)
+    return [
+        (i / 10, f"0. 漸變至 #7f4448 ({i + 1}/{FADE_STEPS})", frames[i * 9:(i + 1) * 9])
+        for i in range(FADE_STEPS)
+    ]
+
+def build_test_sequence():
+    """回傳本次要執行的測試序列 (開場漸變 + TEST_SEQUENCE)；FUSE_TEST_WRITES 為 True 時加入串接寫入的確認步驟。"""
+    if not FUSE_TEST_WRITES:
+        return _fade_steps() + TEST_SEQUENCE
+    return _batch_sequence(_fade_steps() + TEST_SEQUENCE[:-1] + FUSED_CHECK_STEPS, MAX_WRITE_PAYLOAD)
+
+def _write_conn_interval(min_interval: str, max_interval: str, restore: bool = False):
+    # min 必須 <= max：調小時先寫 min，還原 (調大) 時先寫 max
+    order = [("conn_max_interval", max_interval), ("conn_min_interval", min_interval)]
+    if not restore:
+        order.reverse()
+    for name, value in order:
+        with open(os.path.join(HCI_DEBUGFS_ROOT, HCI_ADAPTER, name), "w") as f:
+            f.write(value)
+
+def _tune_conn_interval():
+    """
+    在 Linux 上縮短 BLE 連線間隔，讓每筆 write 不必等待預設約 50 ms 的間隔。
+    回傳原本的 (min, max) 以便還原；不支援或權限不足時回傳 None。
+    """
+    if platform.system() != "Linux":
+        return None
+    debugfs_dir = os.path.join(HCI_DEBUGFS_ROOT, HCI_ADAPTER)
+    if not os.path.isdir(debugfs_dir):
+        logging.info(f"[*] 找不到 {debugfs_dir} (介面不存在、debugfs 未掛載或非 root)，略過連線間隔調整")
+        return None
+    try:
+        with open(os.path.join(debugfs_dir, "conn_min_interval")) as f:
+            old_min = f.read().strip()
+        with open(os.path.join(debugfs_dir, "conn_max_interval")) as f:
+            old_max = f.read().strip()
+        _write_conn_interval(str(CONN_MIN_INTERVAL), str(CONN_MAX_INTERVAL))
+    except OSError as e:
+        logging.warning(f"[!] 無法調整 BLE 連線間隔，沿用系統預設值: {e}")
+        return None
+    logging.info(f"[*] BLE 連線間隔已調整為 {CONN_MIN_INTERVAL}-{CONN_MAX_INTERVAL} (原為 {old_min}-{old_max})")
+    return old_min, old_max
+
+def _restore_conn_interval(saved):
+    """還原 `_tune_conn_interval` 調整前的連線間隔。"""
+    if saved is None:
+        return
+    try:
+        _write_conn_interval(*saved, restore=True)
+    except OSError as e:
+        logging.warning(f"[!] 無法還原 BLE 連線間隔: {e}")
+
+async def _sleep_until(deadline: float):
+    """睡到事件迴圈時間 (loop.time()) 的絕對時間點，已過期則立即返回。"""
+    delay = deadline - asyncio.get_running_loop().time()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+async def _scheduled_write(client: BleakClient, char: BleakGATTCharacteristic, deadline: float, label: str, command: bytes):
+    """在絕對時間點 deadline 送出單一指令，前一步的延遲不會累積到後面的步驟。"""
+    await _sleep_until(deadline)
+    logging.info("[*] %s: %s", label, LazyHex(command))
+    await client.write_gatt_char(char, command, response=False)
+
+# ----------------------------------------------------
+#               連線池 (跨多次測試重複使用)
+# ----------------------------------------------------
+# 每個設備有專屬且常駐的事件迴圈執行緒，已連線的 client 快取在該迴圈上，
+# 同一個行程內重跑測試時可省下連線與服務探索的時間。
+_DEVICE_LOOPS: dict[str, asyncio.AbstractEventLoop] = {}
+_CLIENTS: dict[str, BleakClient] = {}
+
+def _get_device_loop(address: str) -> asyncio.AbstractEventLoop:
+    """取得 (必要時建立) 設備專屬的事件迴圈執行緒。"""
+    loop = _DEVICE_LOOPS.get(address)
+    if loop is None:
+        if not _DEVICE_LOOPS:
+            # 建立第一個設備迴圈時才註冊結束時的清理；只匯入 DEVICE_ADDRESS 的 DMX_cli / DMX_daemon 不受影響
+            atexit.register(close_all_clients)
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name=f"dmx-{address}", daemon=True).start()
+        _DEVICE_LOOPS[address] = loop
+    return loop
+
+async def discover_devices(addresses, timeout: float = SCAN_TIMEOUT) -> dict:
+    """
+    以單一 BleakScanner 一次找出所有目標設備，全部找到即提早結束。
+    回傳 {address: BLEDevice}；沒掃到的設備不在結果中 (連線時再由 bleak 自行搜尋)。
+    """
+    wanted = {address.upper(): address for address in addresses}
+    found = {}
+    all_found = asyncio.Event()
+    if not wanted:
+        return found
+
+    def on_detect(device, advertisement_data):
+        address = wanted.get(device.address.upper())
+        if address is not None and address not in found:
+            found[address] = device
+            if len(found) == len(wanted):
+                all_found.set()
+
+    async with BleakScanner(detection_callback=on_detect):
+        try:
+            await asyncio.wait_for(all_found.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    logging.info(f"[*] 掃描找到 {len(found)}/{len(wanted)} 個設備")
+    return found
+
+async def get_client(address: str, device=None) -> BleakClient:
+    """
+    回傳已連線的 client，只有在尚未連線或連線已中斷時才重新連線。
+    device 為掃描取得的 BLEDevice 時，bleak 連線前不必再各自掃描一次。
+    """
+    client = _CLIENTS.get(address)
+    if client is None or not client.is_connected:
+        # 增加 timeout 參數以避免長時間等待無響應的設備
+        client = BleakClient(device or address, timeout=10.0)
+        await client.connect()
+        _CLIENTS[address] = client
+    return client
+
+async def _disconnect_client(address: str):
+    client = _CLIENTS.pop(address, None)
+    if client is not None and client.is_connected:
+        await client.disconnect()
+
+def close_all_clients():
+    """程式結束時 (atexit) 中斷所有快取的連線並停止設備事件迴圈。"""
+    for address, loop in list(_DEVICE_LOOPS.items()):
+        future = asyncio.run_coroutine_threadsafe(_disconnect_client(address), loop)
+        try:
+            future.result(timeout=5)
+        except (BleakError, OSError, TimeoutError) as e:
+            logging.warning(f"[!] 中斷 {address} 連線時發生錯誤: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+    _DEVICE_LOOPS.clear()
+    atexit.unregister(close_all_clients)
+
+async def test_device(address: str, device=None):
     """
     連接到指定的 DMX 控制器並執行完整的測試序列。
     """
     logging.info(f"[*] 正在嘗試連接到 DMX 控制器: {address}...")
     try:
-        # 增加 timeout 參數以避免長時間等待無響應的設備
-        async with BleakClient(address, timeout=10.0) as client:
-            if not client.is_connected:
-                # 這個判斷理論上在 `async with` 成功後不會觸發，但作為雙重保險
-                logging.error(f"[!] 連接至 {address} 失敗。")
-                return
-
-            logging.info(f"[+] 成功連接到 {address}！準備執行指令序列...")
-            await asyncio.sleep(1)
-
-            # --- 測試序列 ---
-
-            # 1. 設定顏色為 #7f4448
-            cmd_color = create_dmx_rgb_command(r=127, g=68, b=72)
-            logging.info(f"[*] 1. 發送顏色指令 ({cmd_color.hex()})")
-            await client.write_gatt_char(CHARACTERISTIC_UUID, cmd_color, response=False)
-            await asyncio.sleep(2)
-
-            # 2. 將亮度調暗至 20%
-            cmd_bright_low = create_dmx_brightness_command(brightness=20)
-            logging.info(f"[*] 2. 發送低亮度 (20%) 指令: {cmd_bright_low.hex()}")
-            await client.write_gatt_char(CHARACTERISTIC_UUID, cmd_bright_low, response=False)
-            await asyncio.sleep(2)
-
-            # 3. 將亮度調回 100%
-            cmd_bright_high = create_dmx_brightness_command(brightness=100)
-            logging.info(f"[*] 3. 發送高亮度 (100%) 指令: {cmd_bright_high.hex()}")
-            await client.write_gatt_char(CHARACTERISTIC_UUID, cmd_bright_high, response=False)
-            await asyncio.sleep(2)
-
-            # 4. 切換到動態模式 1 (七彩漸變)
-            cmd_mode_1 = create_dmx_mode_command(mode=1)
-            logging.info(f"[*] 4. 切換到動態模式 1: {cmd_mode_1.hex()}")
-            await client.write_gatt_char(CHARACTERISTIC_UUID, cmd_mode_1, response=False)
-            await asyncio.sleep(2)
-
-            # 5. 將模式速度設定為 80%
-            cmd_speed = create_dmx_speed_command(speed=80)
-            logging.info(f"[*] 5. 設定模式速度 (80%): {cmd_speed.hex()}")
-            await client.write_gatt_char(CHARACTERISTIC_UUID, cmd_speed, response=False)
-            logging.info("[*] 請觀察燈光動態效果的速度變化...")
-            await asyncio.sleep(4)
-
-            # 6. 關燈
-            cmd_off = create_dmx_power_command(is_on=False)
-            logging.info(f"[*] 6. 發送關燈指令: {cmd_off.hex()}")
-            await client.write_gatt_char(CHARACTERISTIC_UUID, cmd_off, response=False)
-            await asyncio.sleep(1) # 確保指令有足夠時間發送
-
-            logging.info(f"[+] {address} 的測試序列執行完畢。")
+        client = await get_client(address, device)
+
+        # 連線後只解析一次特徵值，後續寫入直接使用該物件
+        char = client.services.get_characteristic(CHARACTERISTIC_UUID)
+        if char is None:
+            logging.error(f"[!] {address} 上找不到特徵值 {CHARACTERISTIC_UUID}。")
+            return
+
+        logging.info(f"[+] 成功連接到 {address}！準備執行指令序列...")
+
+        # --- 測試序列 ---
+        # 每個步驟各自排程，時間到即送出 (response=False 不需等待前一筆完成)
+        t0 = asyncio.get_running_loop().time()
+        writes = [
+            asyncio.create_task(_scheduled_write(client, char, t0 + delay, label, command))
+            for delay, label, command in build_test_sequence()
+        ]
+        await asyncio.gather(*writes)
+        await asyncio.sleep(1) # 確保指令有足夠時間發送
+
+        logging.info(f"[+] {address} 的測試序列執行完畢。")
 
     except BleakError as e:
         logging.error(f"[!] 連接至 {address} 時發生 Bleak 錯誤: {e}")
-    except Exception as e:
-        # 捕捉其他潛在錯誤，例如指令產生或異步操作中的問題
-        logging.error(f"[!] 處理 {address} 時發生未預期錯誤: {e}")
+    except (OSError, asyncio.TimeoutError) as e:
+        # 連線逾時或底層 D-Bus / 藍牙介面錯誤；取消 (CancelledError) 則照常往外傳遞
+        logging.error(f"[!] 處理 {address} 時發生錯誤: {e}")
 
 
+async def _run_on_device_loop(address: str, device=None):
+    """在設備專屬的事件迴圈上執行 test_device，並在目前的迴圈等待結果。"""
+    future = asyncio.run_coroutine_threadsafe(test_device(address, device), _get_device_loop(address))
+    await asyncio.wrap_future(future)
+
 async def main():
     """
     創建所有設備的測試任務並發執行它們。
     """
     logging.info("[*] 開始執行 DMX 控制器多設備並發測試...")
-    # 為每個設備地址創建一個測試任務
-    tasks = [test_device(address) for address in DEVICE_ADDRESS]
-    # 使用 asyncio.gather 來並發執行所有任務
-    await asyncio.gather(*tasks)
+    # 連線前先縮短連線間隔，新建立的連線才會套用
+    saved_interval = _tune_conn_interval()
+    try:
+        # 尚未連線的設備共用一次掃描，取代連線時各自最長 10 秒的搜尋
+        pending = [a for a in DEVICE_ADDRESS if not (a in _CLIENTS and _CLIENTS[a].is_connected)]
+        devices = await discover_devices(pending)
+        # 每個設備在自己的執行緒與事件迴圈中執行，各自擁有獨立的 D-Bus 連線，
+        # 避免所有設備的回應都擠在同一個事件迴圈排隊處理
+        async with asyncio.TaskGroup() as tg:
+            for address in DEVICE_ADDRESS:
+                tg.create_task(_run_on_device_loop(address, devices.get(address)))
+    finally:
+        _restore_conn_interval(saved_interval)
 
 if __name__ == "__main__":
+    install_uvloop() # 透過 policy 設定，各設備專屬的事件迴圈也會使用 uvloop
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -47,6 +47,10 @@ PIDS_TO_QUERY = {
     "battery_voltage": "ATRV",
 }
 
+# 輪詢時每次都會送出的指令，預先編碼成含結尾 '\r' 的 bytes
+CMD_FAST_DATA = b"0104050C0D11\r" # 04:Load, 05:Temp, 0C:RPM, 0D:Speed, 11:Throttle
+CMD_BATTERY_VOLTAGE = b"ATRV\r"
+
 class RealOBD:
     """
     透過 RFCOMM Socket 與真實的 ELM327 OBD-II 適配器進行同步通訊的類別。
@@ -115,8 +119,8 @@ class RealOBD:
         raw = self._send_command_bytes(command)
         return raw.decode('utf-8', errors='ignore').strip()
 
-    def _send_command_bytes(self, command: str) -> bytes:
-        """發送指令並回傳 Raw Bytes"""
+    def _send_command_bytes(self, command) -> bytes:
+        """發送指令並回傳 Raw Bytes (command 可為 str，或已含 '\r' 的預編碼 bytes)"""
         if not self.sock:
             return b"ERROR"
         
@@ -130,7 +134,9 @@ class RealOBD:
             pass
         self.sock.setblocking(True)
 
-        self.sock.send((command + '\r').encode('utf-8'))
+        if isinstance(command, str):
+            command = (command + '\r').encode('utf-8')
+        self.sock.send(command)
         
         buffer = b""
         while True:
@@ -167,11 +173,11 @@ class RealOBD:
 
         # 1. 批次讀取主要行車數據
         # 04:Load, 05:Temp, 0C:RPM, 0D:Speed, 11:Throttle
-        raw_response = self._send_command_bytes("0104050C0D11")
+        raw_response = self._send_command_bytes(CMD_FAST_DATA)
         parsed = parse_fast_response(raw_response)
 
         # 2. 獨立讀取電壓 (非標準 PID)
-        volt_resp = self._send_command_bytes("ATRV")
+        volt_resp = self._send_command_bytes(CMD_BATTERY_VOLTAGE)
         voltage = self._parse_voltage(volt_resp)
 
         # 3. 組裝 OBDData
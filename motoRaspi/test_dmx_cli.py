@@ -0,0 +1,83 @@
+import pytest
+from DMX_cli import build_plan, parse_line, parse_macs, parse_values
+
+@pytest.mark.parametrize("line, expected", [
+    ("on", ("on", ())),
+    ("OFF", ("off", ())),
+    ("  color 255 0 12  ", ("color", (255, 0, 12))),
+    ("Color 1   2\t3", ("color", (1, 2, 3))),
+    ("brightness 50", ("brightness", (50,))),
+    ("mode 0", ("mode", (0,))),
+    ("speed 100", ("speed", (100,))),
+    ("help", ("help", ())),
+    ("Quit", ("quit", ())),
+    ("exit", ("exit", ())),
+])
+def test_parse_line_accepts(line, expected):
+    assert parse_line(line) == expected
+
+@pytest.mark.parametrize("line", [
+    "",
+    "   ",
+    "bogus",
+    "onx",
+    "on 1",
+    "color 1 2",
+    "color 1 2 3 4",
+    "brightness",
+    "brightness fifty",
+    "brightness -1",
+    "brightness 1000",
+    "mode 1.5",
+    "brightness50",
+    "speed ١٢", # Arabic-Indic digits are not accepted as values
+])
+def test_parse_line_rejects(line):
+    assert parse_line(line) is None
+
+@pytest.mark.parametrize("line, expected", [
+    ("color 255 255 255", ("color", (255, 255, 255))),
+    ("color 256 0 0", None),
+    ("mode 255", ("mode", (255,))),
+    ("mode 256", None),
+    ("speed 999", None),
+])
+def test_parse_line_byte_bounds(line, expected):
+    assert parse_line(line) == expected
+
+def test_parse_values_bounds():
+    assert parse_values(1, "0") == (0,)
+    assert parse_values(1, " 255 ") == (255,)
+    assert parse_values(1, "256") is None
+    assert parse_values(3, "1 2 3") == (1, 2, 3)
+    assert parse_values(3, "1 2") is None
+    assert parse_values(0, "") == ()
+
+def test_parse_macs_dedup_and_case():
+    text = "24:07:03:60:e0:68, 24:07:03:50:B1:20;24:07:03:60:E0:68 bad:mac"
+    assert parse_macs(text) == ["24:07:03:60:E0:68", "24:07:03:50:B1:20"]
+
+def test_parse_macs_none_valid():
+    assert parse_macs("12:34, not-a-mac") == []
+
+def test_build_plan():
+    tokens = ["ON", "color", "255", "0", "0", "brightness", "40", "off"]
+    assert build_plan(tokens) == [
+        ("on", []),
+        ("color", [255, 0, 0]),
+        ("brightness", [40]),
+        ("off", []),
+    ]
+
+def test_build_plan_empty():
+    assert build_plan([]) == []
+
+@pytest.mark.parametrize("tokens, message", [
+    (["bogus"], "Unknown command: bogus"),
+    (["color", "1", "2"], "Usage: color <r> <g> <b>"),
+    (["brightness", "300"], "Usage: brightness <val>"),
+    (["mode", "x"], "Usage: mode <val>"),
+])
+def test_build_plan_rejects(tokens, message):
+    with pytest.raises(ValueError, match=message):
+        build_plan(tokens)
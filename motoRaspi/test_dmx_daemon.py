@@ -0,0 +1,69 @@
+import asyncio
+import socket
+from unittest import mock
+
+import pytest
+from DMX import DMXController
+from DMX_daemon import DMXDaemon, read_message, send_commands, write_message
+
+MAC = "24:07:03:60:E0:68"
+
+async def _stream_pair():
+    """Two connected (reader, writer) pairs over a local socketpair"""
+    a, b = socket.socketpair()
+    return await asyncio.open_connection(sock=a), await asyncio.open_connection(sock=b)
+
+@pytest.mark.parametrize("message", [
+    {"mac": MAC, "steps": [["color", [255, 0, 0]], ["on", []]]},
+    [{"status": "ok"}, {"status": "error", "message": "Unknown command: x"}],
+    {"text": "中文 ✓"},
+    [],
+])
+def test_message_round_trip(message):
+    async def run():
+        (_, writer), (reader, other) = await _stream_pair()
+        write_message(writer, message)
+        write_message(writer, {"second": True}) # Back-to-back messages keep their boundaries
+        await writer.drain()
+        assert await read_message(reader) == message
+        assert await read_message(reader) == {"second": True}
+        writer.close()
+        other.close()
+    asyncio.run(run())
+
+def test_read_message_eof_and_truncated():
+    async def run():
+        (_, writer), (reader, other) = await _stream_pair()
+        writer.write(b"\x00\x00\x00\x10{\"a\"") # Header announces 16 bytes, only 4 follow
+        writer.close()
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_message(reader)
+        other.close()
+    asyncio.run(run())
+
+def test_send_commands_through_daemon(tmp_path):
+    async def run():
+        socket_path = str(tmp_path / "dmx.sock")
+        daemon = DMXDaemon(socket_path=socket_path)
+        controller = DMXController(MAC)
+        controller._client = mock.AsyncMock()
+        controller._connected = True
+        daemon._controllers[MAC] = controller
+
+        server = await asyncio.start_unix_server(daemon.handle_client, socket_path)
+        async with server:
+            replies = await send_commands(MAC, [
+                ("brightness", [50]),
+                ("bogus", []),
+                ("speed", [1, 2]),
+                ("mode", [3]),
+            ], socket_path=socket_path)
+        assert replies == [
+            {"status": "ok"},
+            {"status": "error", "message": "Unknown command: bogus"},
+            {"status": "error", "message": "speed takes 1 value(s), got 2"},
+            {"status": "ok"},
+        ]
+        written = [call.args[1] for call in controller._client.write_gatt_char.call_args_list]
+        assert written == [bytes.fromhex("7bff01103201ffffbf"), bytes.fromhex("7bff0303ffffffffbf")]
+    asyncio.run(run())